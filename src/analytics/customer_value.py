@@ -0,0 +1,328 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# RFM + BG/NBD customer value engine
+# ============================================
+#
+# Everything is computed from one (customer_id, order_date) sort of the
+# order table: group boundaries come from np.flatnonzero on the sorted ids
+# and per-customer first/last/count/sum are reduceat/index lookups, so the
+# cost is one sort plus a few linear passes regardless of customer count.
+
+SCORE_BINS = 5
+DAYS_PER_WEEK = 7.0
+
+
+def summarize_orders(customer_ids, order_dates, amounts, as_of=None):
+    """Per-customer recency/frequency/monetary and BG/NBD inputs, one sorted pass.
+
+    Returns a DataFrame indexed by customer_id with first/last order,
+    orders, total/avg spend, recency_days and the BG/NBD summary
+    (x = repeat purchases, t_x = last - first, T = as_of - first, in weeks).
+    """
+    ids = np.asarray(customer_ids, dtype=np.int64)
+    dates = np.asarray(order_dates, dtype="datetime64[ns]")
+    amounts = np.asarray(amounts, dtype=np.float64)
+
+    # one argsort on a packed (customer_id, seconds since first order) key is
+    # ~3x faster than lexsort over the two columns
+    seconds = dates.astype("datetime64[s]").astype(np.int64)
+    seconds = seconds - seconds.min() if len(seconds) else seconds
+    order = np.argsort((ids << 32) | seconds, kind="stable")
+    ids, dates, amounts = ids[order], dates[order], amounts[order]
+
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)] - 1
+    counts = ends - starts + 1
+    totals = np.add.reduceat(amounts, starts) if len(ids) else np.array([])
+
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(dates.max()) + pd.Timedelta(days=1)
+    as_of = np.datetime64(as_of, "ns")
+    first, last = dates[starts], dates[ends]
+    day = np.timedelta64(1, "D")
+
+    return pd.DataFrame({
+        "first_order_date": first,
+        "last_order_date": last,
+        "total_orders": counts,
+        "total_spent": np.round(totals, 2),
+        "avg_order_value": totals / counts,
+        "recency_days": ((as_of - last) / day).astype(np.int64),
+        "x": counts - 1,
+        "t_x": (last - first) / day / DAYS_PER_WEEK,
+        "T": (as_of - first) / day / DAYS_PER_WEEK,
+    }, index=pd.Index(ids[starts], name="customer_id"))
+
+
+def score_rfm(summary, bins=SCORE_BINS):
+    """1..bins quantile scores; recent, frequent and high-spend customers score high."""
+    def quantile_score(values, ascending=True):
+        pct = pd.Series(values).rank(method="average", pct=True, ascending=ascending).to_numpy()
+        return np.clip(np.ceil(pct * bins), 1, bins).astype(np.int8)
+
+    r = quantile_score(summary["recency_days"].to_numpy(), ascending=False)
+    f = quantile_score(summary["total_orders"].to_numpy())
+    m = quantile_score(summary["total_spent"].to_numpy())
+    return pd.DataFrame({"r_score": r, "f_score": f, "m_score": m}, index=summary.index)
+
+
+def rfm_segments(scores, total_orders):
+    """Map RFM scores onto the CRM segment vocabulary."""
+    r, f = scores["r_score"].to_numpy(), scores["f_score"].to_numpy()
+    orders = np.asarray(total_orders)
+    conditions = [
+        r <= 1,
+        r <= 2,
+        (orders <= 1) & (r >= 4),
+        (f >= 4) & (r >= 3),
+    ]
+    return np.select(conditions, ["Churned", "At Risk", "New", "Loyal"], default="Active")
+
+
+# ============================================
+# BG/NBD (Fader, Hardie & Lee 2005)
+# ============================================
+
+def _log_rising(base, counts, table_size):
+    """log Γ(base + n) - log Γ(base) for integer n, via a cumulative log table."""
+    table = np.r_[0.0, np.cumsum(np.log(base + np.arange(table_size)))]
+    return table[counts]
+
+
+def bgnbd_log_likelihood(params, x, t_x, T, weights):
+    r, alpha, a, b = params
+    size = int(x.max()) + 1
+    A1 = _log_rising(r, x, size) + r * np.log(alpha)
+    A2 = _log_rising(b, x, size) - _log_rising(a + b, x, size)
+    A3 = -(r + x) * np.log(alpha + T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        A4 = np.where(
+            x > 0,
+            np.log(a) - np.log(np.maximum(b + x - 1, 1e-12)) - (r + x) * np.log(alpha + t_x),
+            -np.inf,
+        )
+    return np.sum(weights * (A1 + A2 + np.logaddexp(A3, A4)))
+
+
+def _nelder_mead(f, x0, iterations=400, tol=1e-7):
+    """Minimal Nelder-Mead minimiser (keeps the engine free of a scipy dependency)."""
+    n = len(x0)
+    simplex = np.vstack([x0] + [x0 + np.eye(n)[i] * 0.5 for i in range(n)])
+    values = np.array([f(p) for p in simplex])
+    for _ in range(iterations):
+        order = np.argsort(values)
+        simplex, values = simplex[order], values[order]
+        if abs(values[-1] - values[0]) < tol * (abs(values[0]) + tol):
+            break
+        centroid = simplex[:-1].mean(axis=0)
+        reflected = centroid + (centroid - simplex[-1])
+        fr = f(reflected)
+        if fr < values[0]:
+            expanded = centroid + 2 * (centroid - simplex[-1])
+            fe = f(expanded)
+            simplex[-1], values[-1] = (expanded, fe) if fe < fr else (reflected, fr)
+        elif fr < values[-2]:
+            simplex[-1], values[-1] = reflected, fr
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            fc = f(contracted)
+            if fc < values[-1]:
+                simplex[-1], values[-1] = contracted, fc
+            else:
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = [f(p) for p in simplex[1:]]
+    return simplex[np.argmin(values)]
+
+
+def fit_bgnbd(summary):
+    """MLE of (r, alpha, a, b) on log-parameters.
+
+    Customers are collapsed onto unique (x, t_x, T) day-level histories
+    first, so each likelihood evaluation scales with distinct histories,
+    not customers.
+    """
+    # whole days are plenty of resolution and make histories collide
+    days_x = np.round(summary["t_x"].to_numpy() * DAYS_PER_WEEK).astype(np.int64)
+    days_T = np.round(summary["T"].to_numpy() * DAYS_PER_WEEK).astype(np.int64)
+    packed = (summary["x"].to_numpy(np.int64) << 40) | (days_x << 20) | days_T
+    unique, weights = np.unique(packed, return_counts=True)
+    x = unique >> 40
+    t_x = ((unique >> 20) & 0xFFFFF) / DAYS_PER_WEEK
+    T = (unique & 0xFFFFF) / DAYS_PER_WEEK
+
+    def objective(log_params):
+        value = -bgnbd_log_likelihood(np.exp(log_params), x, t_x, T, weights)
+        return value if np.isfinite(value) else np.inf
+
+    return np.exp(_nelder_mead(objective, np.zeros(4)))
+
+
+def hyp2f1(a, b, c, z, tol=1e-12, max_terms=100_000):
+    """Gauss hypergeometric 2F1(a, b; c; z) for 0 <= z < 1, by its power series.
+
+    Terms follow t_{k+1} = t_k (a + k)(b + k) / ((c + k)(k + 1)) z; each
+    element drops out of the loop once its terms are shrinking and
+    negligible, so the cost follows the slowest-converging (largest z) rows.
+    """
+    a, b, c, z = (np.asarray(v, dtype=np.float64) for v in np.broadcast_arrays(a, b, c, z))
+    term = np.ones(a.shape)
+    total = np.ones(a.shape)
+    active = np.flatnonzero(z > 0)
+    for k in range(max_terms):
+        if not active.size:
+            break
+        ratio = (a[active] + k) * (b[active] + k) / ((c[active] + k) * (k + 1)) * z[active]
+        term[active] *= ratio
+        total[active] += term[active]
+        tail = tol * (1 - z[active]) * np.abs(total[active])  # remaining terms sum to ~ term / (1 - z)
+        active = active[(ratio >= 1) | (np.abs(term[active]) > tail)]
+    return total
+
+
+A_NEAR_ONE = 1e-4  # |a - 1| below which eq. 10 is evaluated by its limit
+
+
+def _bgnbd_expected_alive(r, alpha, a, b, x, T, t):
+    """E[Y(t) | x, T] for a customer known to be alive (eq. 10 without P(alive))."""
+    z = t / (alpha + T + t)
+    hyper = hyp2f1(r + x, b + x, a + b + x - 1, z)
+    decay = np.exp((r + x) * np.log((alpha + T) / (alpha + T + t)))
+    return (a + b + x - 1) / (a - 1) * (1 - decay * hyper)
+
+
+def bgnbd_predict(params, summary, horizon_weeks):
+    """P(alive) and conditional expected purchases over the next `horizon_weeks`.
+
+    E[Y(t) | x, t_x, T] = (a + b + x - 1) / (a - 1)
+        * [1 - ((alpha + T) / (alpha + T + t))^(r + x) * 2F1(r + x, b + x; a + b + x - 1; t / (alpha + T + t))]
+        / (1 + [x > 0] a / (b + x - 1) * ((alpha + T) / (alpha + t_x))^(r + x))
+    (Fader, Hardie & Lee 2005, eq. 10); the denominator is 1 / P(alive).
+
+    At a = 1 the bracket and a - 1 both vanish; within A_NEAR_ONE of it the
+    limit is taken as the mean of a = 1 -/+ A_NEAR_ONE, which is smooth
+    there and accurate to O(A_NEAR_ONE^2).
+    """
+    r, alpha, a, b = params
+    x, t_x, T = summary["x"].to_numpy(), summary["t_x"].to_numpy(), summary["T"].to_numpy()
+    t = float(horizon_weeks)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        odds = np.where(
+            x > 0,
+            a / np.maximum(b + x - 1, 1e-12) * ((alpha + T) / (alpha + t_x)) ** (r + x),
+            0.0,
+        )
+    p_alive = 1.0 / (1.0 + odds)
+
+    if abs(a - 1) < A_NEAR_ONE:
+        expected = 0.5 * (_bgnbd_expected_alive(r, alpha, 1 - A_NEAR_ONE, b, x, T, t)
+                          + _bgnbd_expected_alive(r, alpha, 1 + A_NEAR_ONE, b, x, T, t))
+    else:
+        expected = _bgnbd_expected_alive(r, alpha, a, b, x, T, t)
+    return p_alive, expected * p_alive
+
+
+# ============================================
+# Cohort retention
+# ============================================
+
+def cohort_retention(customer_ids, signup_dates, order_customer_ids, order_dates):
+    """Signup-month cohort x months-since-signup share of customers ordering.
+
+    (customer, active month) pairs are de-duplicated with one sort of a
+    packed int64 key and counted into the matrix with np.bincount.
+    """
+    cust = np.asarray(customer_ids, dtype=np.int64)
+    cohort = np.asarray(signup_dates, dtype="datetime64[M]").astype(np.int64)
+    o_cust = np.asarray(order_customer_ids, dtype=np.int64)
+    o_month = np.asarray(order_dates, dtype="datetime64[M]").astype(np.int64)
+
+    # dense id -> signup month table (-1 = unknown customer), no joins
+    size = int(max(cust.max(initial=0), o_cust.max(initial=0))) + 1
+    lookup = np.full(size, -1, dtype=np.int64)
+    lookup[cust] = cohort
+    o_cohort = lookup[o_cust]
+    offset = o_month - o_cohort
+    valid = (o_cohort >= 0) & (offset >= 0)
+
+    pairs = np.sort((o_cust[valid] << 16) | offset[valid])
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+    pair_cust, pair_offset = pairs >> 16, pairs & 0xFFFF
+    pair_cohort = lookup[pair_cust]
+
+    cohorts, cohort_idx = np.unique(cohort, return_inverse=True)
+    sizes = np.bincount(cohort_idx, minlength=len(cohorts))
+    width = int(pair_offset.max()) + 1 if len(pair_offset) else 1
+    row = np.searchsorted(cohorts, pair_cohort)
+    active = np.bincount(row * width + pair_offset, minlength=len(cohorts) * width).reshape(len(cohorts), width)
+
+    grid_cohort = np.repeat(cohorts, width)
+    grid_offset = np.tile(np.arange(width), len(cohorts))
+    result = pd.DataFrame({
+        "cohort_month": grid_cohort.astype("datetime64[M]").astype("datetime64[ns]"),
+        "months_since_signup": grid_offset.astype(np.int16),
+        "cohort_size": np.repeat(sizes, width).astype(np.int32),
+        "active_customers": active.ravel().astype(np.int32),
+    })
+    result["retention_rate"] = np.round(result["active_customers"] / result["cohort_size"], 4)
+    return result
+
+
+# ============================================
+# Engine
+# ============================================
+
+def customer_value(orders, as_of=None, horizon_days=365):
+    """RFM scores, CRM segment, P(alive) and CLV per customer with orders.
+
+    `orders` needs customer_id, order_date and net_amount; canceled orders
+    should already be excluded.
+    """
+    summary = summarize_orders(
+        orders["customer_id"].to_numpy(), orders["order_date"].to_numpy(),
+        orders["net_amount"].to_numpy(), as_of,
+    )
+    scores = score_rfm(summary)
+    params = fit_bgnbd(summary)
+    p_alive, expected = bgnbd_predict(params, summary, horizon_days / DAYS_PER_WEEK)
+
+    result = summary.drop(columns=["x", "t_x", "T"]).join(scores)
+    # "RFM" cell as a 3-digit int (e.g. 545): compact and sorts like the string
+    result["rfm_score"] = (
+        scores["r_score"].astype(np.int16) * 100 + scores["f_score"] * 10 + scores["m_score"]
+    ).astype(np.int16)
+    result["segment"] = rfm_segments(scores, summary["total_orders"])
+    result["p_alive"] = np.round(p_alive, 4)
+    result["expected_orders"] = np.round(expected, 3)
+    result["clv_estimate"] = np.round(expected * summary["avg_order_value"].to_numpy(), 2)
+    result["avg_order_value"] = result["avg_order_value"].round(2)
+    return result.reset_index(), params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the RFM/CLV engine.")
+    parser.add_argument("--customers", type=int, default=2_000_000)
+    parser.add_argument("--orders", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    orders = pd.DataFrame({
+        "customer_id": np.random.randint(1, args.customers + 1, args.orders),
+        "order_date": np.datetime64("2023-01-01") + np.random.randint(0, 365 * 86400, args.orders).astype("timedelta64[s]"),
+        "net_amount": np.random.gamma(2.0, 60.0, args.orders),
+    })
+    signup = np.datetime64("2022-01-01") + np.random.randint(0, 365, args.customers).astype("timedelta64[D]")
+
+    t0 = time.perf_counter()
+    values, params = customer_value(orders)
+    value_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    matrix = cohort_retention(np.arange(1, args.customers + 1), signup, orders["customer_id"], orders["order_date"])
+    cohort_s = time.perf_counter() - t0
+
+    print(f"BG/NBD params r={params[0]:.3f} alpha={params[1]:.3f} a={params[2]:.3f} b={params[3]:.3f}")
+    print(f"{len(values):,} customers / {args.orders:,} orders: RFM+CLV {value_s:.2f}s, "
+          f"cohort matrix {cohort_s:.2f}s")
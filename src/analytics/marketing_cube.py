@@ -0,0 +1,225 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.file_io import PROCESSED_DIR, read_table
+
+# ============================================
+# Cube layout
+# ============================================
+#
+# Entity hierarchy: ad -> ad_group -> campaign -> platform
+# Time hierarchy:   day -> week (Monday) -> month
+#
+# Only additive measures are stored; every cuboid is the sum of the one
+# below it, and ratios (CTR, CPC, CPM, CPL, ...) are derived at query time
+# so they stay correct at every level.
+
+LEVELS = ("ad", "ad_group", "campaign", "platform")
+GRAINS = ("day", "week", "month")
+KEYS = {"ad": "ad_id", "ad_group": "ad_group_id", "campaign": "campaign_id", "platform": "platform"}
+MEASURES = ["impressions", "clicks", "spend", "leads", "mqls", "buyers"]
+
+DERIVED = {
+    "ctr": lambda m: m["clicks"] / m["impressions"],
+    "cpc": lambda m: m["spend"] / m["clicks"],
+    "cpm": lambda m: m["spend"] / m["impressions"] * 1000,
+    "cpl": lambda m: m["spend"] / m["leads"],
+    "mql_rate": lambda m: m["mqls"] / m["leads"],
+    "cost_per_buyer": lambda m: m["spend"] / m["buyers"],
+}
+
+CUBE_DIR = PROCESSED_DIR / "marketing_cube"
+
+
+def _period(dates, grain):
+    dates = pd.DatetimeIndex(dates).normalize()
+    if grain == "day":
+        return dates
+    if grain == "week":
+        return dates - pd.to_timedelta(dates.weekday, unit="D")
+    return pd.DatetimeIndex(dates.to_numpy().astype("datetime64[M]"))
+
+
+def _rollup(frame, key, new_key, mapping=None, grain=None):
+    """Sum a cuboid up one step of either hierarchy."""
+    keys = frame[key].to_numpy() if mapping is None else mapping(frame[key].to_numpy())
+    periods = frame["period"] if grain is None else _period(frame["period"], grain)
+    out = (
+        frame[MEASURES]
+        .groupby([np.asarray(periods), keys], sort=True)
+        .sum()
+    )
+    out.index.names = ["period", new_key]
+    return out.reset_index()
+
+
+def _lookup(parent_ids, child_ids, name):
+    """Dense array mapping child id -> parent id (ids are small positive ints).
+
+    Slots without a child hold -1; looking up an id with no parent raises
+    rather than rolling its rows up into some other entity.
+    """
+    table = np.full(int(child_ids.max()) + 1, -1, dtype=np.result_type(parent_ids.dtype, np.int8))
+    table[child_ids] = parent_ids
+
+    def lookup(ids):
+        ids = np.asarray(ids)
+        known = (ids >= 0) & (ids < len(table))
+        parents = np.full(len(ids), -1, dtype=table.dtype)
+        parents[known] = table[ids[known]]
+        if (parents < 0).any():
+            raise ValueError(f"No {name} for id(s) {np.unique(ids[parents < 0]).tolist()}")
+        return parents
+
+    return lookup
+
+
+# ============================================
+# Cube
+# ============================================
+
+class MarketingCube:
+    """Precomputed ad/ad_group/campaign/platform x day/week/month aggregates."""
+
+    def __init__(self, cuboids):
+        self.cuboids = cuboids
+
+    @classmethod
+    def build(cls, daily_performance, ads, ad_groups, campaigns, leads):
+        # ---- base cuboid: ad x day with spend metrics and funnel counts
+        perf = pd.DataFrame({
+            "period": _period(daily_performance["date"], "day"),
+            "ad_id": daily_performance["ad_id"].to_numpy(),
+            "impressions": daily_performance["impressions"].to_numpy(np.int64),
+            "clicks": daily_performance["clicks"].to_numpy(np.int64),
+            "spend": daily_performance["spend"].to_numpy(np.float64),
+        })
+        funnel = pd.DataFrame({
+            "period": _period(leads["lead_date"], "day"),
+            "ad_id": leads["ad_id"].to_numpy(),
+            "leads": 1,
+            "mqls": leads["is_mql"].to_numpy(np.int64),
+            "buyers": leads["became_buyer"].to_numpy(np.int64),
+        })
+        base = (
+            pd.concat([perf, funnel], ignore_index=True)
+            .reindex(columns=["period", "ad_id"] + MEASURES)
+            .fillna(0)
+            .groupby(["period", "ad_id"], sort=True)
+            .sum()
+            .reset_index()
+        )
+        for col in ("impressions", "clicks", "leads", "mqls", "buyers"):
+            base[col] = base[col].astype(np.int64)
+
+        # ---- entity roll-ups via dense lookup arrays (no joins)
+        ad_to_group = _lookup(ads["ad_group_id"].to_numpy(), ads["ad_id"].to_numpy(), "ad group")
+        group_to_campaign = _lookup(ad_groups["campaign_id"].to_numpy(), ad_groups["ad_group_id"].to_numpy(),
+                                    "campaign")
+        platform_codes, platform_labels = pd.factorize(campaigns["platform"].astype(str))
+        campaign_to_platform = _lookup(platform_codes, campaigns["campaign_id"].to_numpy(), "platform")
+
+        day = {"ad": base}
+        day["ad_group"] = _rollup(day["ad"], "ad_id", "ad_group_id", ad_to_group)
+        day["campaign"] = _rollup(day["ad_group"], "ad_group_id", "campaign_id", group_to_campaign)
+        day["platform"] = _rollup(day["campaign"], "campaign_id", "platform", campaign_to_platform)
+        day["platform"]["platform"] = np.asarray(platform_labels)[day["platform"]["platform"]]
+
+        # ---- time roll-ups from each day cuboid
+        cuboids = {}
+        for level in LEVELS:
+            key = KEYS[level]
+            cuboids[(level, "day")] = day[level]
+            cuboids[(level, "week")] = _rollup(day[level], key, key, grain="week")
+            # weeks straddle month boundaries, so months roll up from days
+            cuboids[(level, "month")] = _rollup(day[level], key, key, grain="month")
+        return cls(cuboids)
+
+    @classmethod
+    def from_raw(cls, raw_dir=None):
+        kwargs = {} if raw_dir is None else {"raw_dir": raw_dir}
+        return cls.build(
+            read_table("marketing", "daily_performance",
+                       columns=["ad_id", "date", "impressions", "clicks", "spend"], **kwargs),
+            read_table("marketing", "ads", columns=["ad_id", "ad_group_id"], **kwargs),
+            read_table("marketing", "ad_groups", columns=["ad_group_id", "campaign_id"], **kwargs),
+            read_table("marketing", "campaigns", columns=["campaign_id", "platform"], **kwargs),
+            read_table("marketing", "leads",
+                       columns=["ad_id", "lead_date", "is_mql", "became_buyer"], **kwargs),
+        )
+
+    # ---- persistence
+
+    def save(self, cube_dir=CUBE_DIR):
+        cube_dir = Path(cube_dir)
+        cube_dir.mkdir(parents=True, exist_ok=True)
+        for (level, grain), frame in self.cuboids.items():
+            frame.to_parquet(cube_dir / f"{level}_{grain}.parquet", index=False)
+
+    @classmethod
+    def load(cls, cube_dir=CUBE_DIR):
+        cube_dir = Path(cube_dir)
+        return cls({
+            (level, grain): pd.read_parquet(cube_dir / f"{level}_{grain}.parquet")
+            for level in LEVELS for grain in GRAINS
+        })
+
+    # ---- queries
+
+    def query(self, level="campaign", grain="day", start=None, end=None, members=None,
+              metrics=None):
+        """Slice one cuboid and add derived ratios.
+
+        Cuboids are sorted by period, so the date range is two binary
+        searches; `members` filters the level key (e.g. campaign ids or
+        platform names).
+        """
+        frame = self.cuboids[(level, grain)]
+        periods = frame["period"].to_numpy()
+        lo = 0 if start is None else np.searchsorted(periods, np.datetime64(pd.Timestamp(start)), "left")
+        hi = len(frame) if end is None else np.searchsorted(periods, np.datetime64(pd.Timestamp(end)), "right")
+        result = frame.iloc[lo:hi]
+        if members is not None:
+            result = result[result[KEYS[level]].isin(members)]
+
+        result = result.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in (DERIVED if metrics is None else metrics):
+                result[name] = DERIVED[name](result).replace([np.inf, -np.inf], np.nan)
+        return result.reset_index(drop=True)
+
+    def totals(self, level="campaign", start=None, end=None, members=None, metrics=None):
+        """One row per member over the whole date range."""
+        sliced = self.query(level, "day", start, end, members, metrics=[])
+        summed = sliced.groupby(KEYS[level], sort=True)[MEASURES].sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name in (DERIVED if metrics is None else metrics):
+                summed[name] = DERIVED[name](summed).replace([np.inf, -np.inf], np.nan)
+        return summed.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the marketing cube and time slice queries.")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    cube = MarketingCube.from_raw()
+    print(f"built {len(cube.cuboids)} cuboids in {time.perf_counter() - t0:.2f}s")
+    if not args.no_save:
+        cube.save()
+
+    queries = {
+        "platform x week": dict(level="platform", grain="week"),
+        "campaign x day, March": dict(level="campaign", grain="day", start="2023-03-01", end="2023-03-31"),
+        "3 campaigns x month": dict(level="campaign", grain="month", members=[1, 2, 3]),
+        "ad x day, one week": dict(level="ad", grain="day", start="2023-05-01", end="2023-05-07"),
+    }
+    for label, kwargs in queries.items():
+        t0 = time.perf_counter()
+        rows = len(cube.query(**kwargs))
+        print(f"{label:<24} {rows:>6} rows  {(time.perf_counter() - t0) * 1000:.2f} ms")
@@ -0,0 +1,50 @@
+# ============================================
+# Domain generators
+# ============================================
+#
+# Each module exposes generate(source=None, seed=42) -> {table: DataFrame}
+# and does nothing at import time. Modules are imported on demand so that
+# `import src.etl` (and the CLI's --help) never pays for pandas.
+
+DOMAINS = {
+    # dependency order: later domains read earlier ones through the TableSource
+    "finance": "src.etl.generate_finance_data",
+    "marketing": "src.etl.generate_marketing_data",
+    "ecommerce": "src.etl.generate_ecommerce",
+    "crm": "src.etl.generate_crm_data",
+    "web": "src.etl.generate_web_data",
+}
+
+
+def generate(domains=None, seed=42, source=None, raw_dir=None, cdc=False):
+    """Run `domains` (default: all) in dependency order within one process.
+
+    Returns {domain: {table: DataFrame}}. Each domain's output is added to
+    the shared TableSource, so downstream domains read it from memory;
+    upstream domains not in this run are read from `raw_dir`. With `cdc`,
+    domains that have change logs (see src.etl.cdc) also return
+    `<table>_cdc` insert/update/delete logs.
+    """
+    from importlib import import_module
+
+    from src.utils.file_io import RAW_DIR, TableSource
+
+    selected = list(DOMAINS) if domains is None else list(domains)
+    unknown = [d for d in selected if d not in DOMAINS]
+    if unknown:
+        raise ValueError(f"Unknown domains {unknown}; choose from {list(DOMAINS)}")
+
+    if source is None:
+        source = TableSource(RAW_DIR if raw_dir is None else raw_dir)
+    results = {}
+    for domain in DOMAINS:
+        if domain not in selected:
+            continue
+        tables = import_module(DOMAINS[domain]).generate(source=source, seed=seed)
+        source.add(domain, tables)
+        if cdc:
+            from src.etl.cdc import cdc_logs
+
+            tables = {**tables, **cdc_logs(domain, tables, seed=seed)}
+        results[domain] = tables
+    return results
@@ -0,0 +1,58 @@
+import argparse
+import time
+
+from src.etl import DOMAINS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.etl",
+        description="Generate synthetic domains in one process and save them under <out>/<domain>/.",
+    )
+    parser.add_argument("--domains", nargs="+", choices=list(DOMAINS), default=list(DOMAINS),
+                        help="domains to generate (run in dependency order; default: all)")
+    parser.add_argument("--out", default=None, help="output root (default: data/raw)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--cdc", action="store_true",
+                        help="also write insert/update/delete logs (<table>_cdc) for invoices, tickets "
+                             "and CRM lifecycle")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always regenerate instead of restoring unchanged domains from the build cache")
+    parser.add_argument("--cache-dir", default=None, help="build cache location (default: <out>/.build_cache)")
+    args = parser.parse_args(argv)
+
+    # heavy imports only once arguments are valid
+    from pathlib import Path
+
+    from src.etl import generate
+    from src.etl.build_cache import BuildCache, TracingSource
+    from src.utils.file_io import RAW_DIR, TableSource, save_tables
+
+    out = RAW_DIR if args.out is None else Path(args.out)
+    cache = None if args.no_cache else BuildCache(out, args.cache_dir)
+    source = TableSource(out) if cache is None else TracingSource(out)
+    params = {"seed": args.seed, "cdc": args.cdc, "compression": args.compression, "chunk_rows": args.chunk_rows}
+    t0 = time.perf_counter()
+    for domain in (d for d in DOMAINS if d in args.domains):
+        if cache is not None:
+            base = cache.base_key(domain, **params)
+            entry = cache.lookup(domain, base)
+            if entry is not None:
+                restored = cache.restore(domain, entry)
+                print(f"{domain} unchanged ({entry['key'][:12]}), {'restored from' if restored else 'kept'} cache.")
+                continue
+            source.reads.clear()
+        tables = generate([domain], seed=args.seed, source=source, cdc=args.cdc)[domain]
+        save_tables(out / domain, tables, compression=args.compression, chunk_rows=args.chunk_rows)
+        if cache is not None:
+            cache.store(domain, base, source.reads, tables)
+        print(f"Full {domain} domain generated successfully.")
+    if cache is not None:
+        cache.save()
+    print(f"generated {len(args.domains)} domain(s) into {out} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
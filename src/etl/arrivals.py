@@ -0,0 +1,138 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# Seasonality profiles (relative multipliers)
+# ============================================
+
+# hour of day 0..23 — consumer traffic: quiet nights, lunch bump, evening peak
+RETAIL_DAILY = np.array([
+    0.25, 0.15, 0.10, 0.08, 0.08, 0.12, 0.30, 0.55, 0.80, 0.95, 1.05, 1.20,
+    1.35, 1.25, 1.10, 1.05, 1.10, 1.25, 1.50, 1.75, 1.85, 1.60, 1.05, 0.55,
+])
+# office hours only
+BUSINESS_DAILY = np.array([0.02] * 8 + [1.0] * 10 + [0.05] * 6)
+FLAT_DAILY = np.ones(24)
+
+# day of week, Monday=0 .. Sunday=6
+RETAIL_WEEKLY = np.array([0.90, 0.90, 0.95, 1.00, 1.15, 1.30, 1.10])
+BUSINESS_WEEKLY = np.array([1.0, 1.0, 1.0, 1.0, 1.0, 0.05, 0.05])
+FLAT_WEEKLY = np.ones(7)
+
+SECONDS_PER_HOUR = 3600
+
+
+def campaign_calendar(num_campaigns=60, first="2023-01-01", every_days=5, length_days=10):
+    """Start/end dates of the marketing campaigns: a fixed calendar, independent of the seed.
+
+    Marketing builds its campaigns on it and finance reads it from here, so
+    finance does not depend on marketing output that is generated after it.
+    """
+    start = pd.date_range(first, periods=num_campaigns, freq=f"{every_days}D")
+    return pd.DataFrame({"start_date": start, "end_date": start + pd.Timedelta(days=length_days - 1)})
+
+
+def promos_from_campaigns(campaigns, lift=1.8):
+    """(start, end, lift) spikes from marketing campaigns' start/end dates."""
+    if campaigns is None or len(campaigns) == 0:
+        return []
+    end = pd.to_datetime(campaigns["end_date"]) + pd.Timedelta(days=1)
+    return list(zip(pd.to_datetime(campaigns["start_date"]), end, [lift] * len(campaigns)))
+
+
+# ============================================
+# Non-homogeneous arrival model
+# ============================================
+
+class ArrivalModel:
+    """Piecewise-constant (hourly) arrival intensity.
+
+    rate(h) = daily[hour] * weekly[weekday] * (1 + trend) ** years * promo lift
+
+    Promo windows are applied with a boundary array + cumsum, so any
+    number of campaigns costs one pass over the hours. Sampling never
+    loops per event: events are spread over hourly bins (multinomial for a
+    fixed count, Poisson for a rate) and placed inside each bin by the
+    uniform inverse CDF of a constant-rate segment.
+    """
+
+    def __init__(self, daily=FLAT_DAILY, weekly=FLAT_WEEKLY, trend=0.0, promos=(),
+                 origin="2023-01-01"):
+        self.daily = np.asarray(daily, dtype=np.float64)
+        self.weekly = np.asarray(weekly, dtype=np.float64)
+        self.trend = trend
+        self.promos = list(promos)
+        self.origin_hour = self._to_hours(origin)
+
+    @staticmethod
+    def _to_hours(value):
+        return int(pd.Timestamp(value).value // (SECONDS_PER_HOUR * 10**9))
+
+    def hourly_intensity(self, start, end):
+        """(hour index since epoch, relative intensity) for [start, end)."""
+        hours = np.arange(self._to_hours(start), self._to_hours(end), dtype=np.int64)
+        weekday = (hours // 24 + 3) % 7  # 1970-01-01 was a Thursday
+        weights = self.daily[hours % 24] * self.weekly[weekday]
+
+        if self.trend:
+            years = (hours - self.origin_hour) / (24 * 365.25)
+            weights *= (1.0 + self.trend) ** years
+
+        if self.promos and len(hours):
+            first = hours[0]
+            starts = np.array([self._to_hours(s) for s, _, _ in self.promos]) - first
+            ends = np.array([self._to_hours(e) for _, e, _ in self.promos]) - first
+            log_lift = np.log([lift for _, _, lift in self.promos])
+            boundary = np.zeros(len(hours) + 1)
+            np.add.at(boundary, np.clip(starts, 0, len(hours)), log_lift)
+            np.add.at(boundary, np.clip(ends, 0, len(hours)), -log_lift)
+            weights *= np.exp(np.cumsum(boundary[:-1]))
+
+        return hours, weights
+
+    @staticmethod
+    def _place(hours, counts):
+        """Sorted timestamps: `counts[i]` uniform arrivals inside hour `hours[i]`."""
+        base = np.repeat(hours * SECONDS_PER_HOUR, counts)
+        offsets = np.random.randint(0, SECONDS_PER_HOUR, len(base))
+        return np.sort(base + offsets).astype("datetime64[s]").astype("datetime64[ns]")
+
+    def sample(self, start, end, n):
+        """Exactly `n` sorted timestamps in [start, end)."""
+        hours, weights = self.hourly_intensity(start, end)
+        counts = np.random.multinomial(n, weights / weights.sum())
+        return self._place(hours, counts)
+
+    def iter_sample(self, start, end, rate, chunk_hours=24 * 7):
+        """Poisson arrivals at `rate` events/hour on average, yielded in sorted chunks.
+
+        Memory is bounded by one chunk, so the total can run into billions.
+        """
+        hours, weights = self.hourly_intensity(start, end)
+        expected = rate * weights / weights.mean()
+        for i in range(0, len(hours), chunk_hours):
+            counts = np.random.poisson(expected[i:i + chunk_hours])
+            yield self._place(hours[i:i + chunk_hours], counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk arrival sampling.")
+    parser.add_argument("--events", type=float, default=2e8, help="approximate total events")
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2024-01-01")
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    model = ArrivalModel(RETAIL_DAILY, RETAIL_WEEKLY, trend=0.2,
+                         promos=[("2023-11-24", "2023-11-28", 3.0)])
+    hours = ArrivalModel._to_hours(args.end) - ArrivalModel._to_hours(args.start)
+
+    t0 = time.perf_counter()
+    total = 0
+    for chunk in model.iter_sample(args.start, args.end, rate=args.events / hours):
+        total += len(chunk)
+    elapsed = time.perf_counter() - t0
+    print(f"{total:,} timestamps in {elapsed:.2f}s ({total / elapsed / 1e6:.1f}M events/s)")
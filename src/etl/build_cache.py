@@ -0,0 +1,233 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from src.etl import DOMAINS
+from src.utils.file_io import PROJECT_ROOT, RAW_DIR, TableSource, compute_etag, table_files
+
+# ============================================
+# Content-addressed build cache
+# ============================================
+#
+# A domain's output is keyed by the hash of its generator code (the module
+# and everything it imports from src/), the run parameters and the
+# fingerprints of the upstream tables it read. Generators fall back to
+# synthetic inputs when an upstream table is missing, so dependencies are
+# traced per build rather than declared: the index maps a base key (code +
+# parameters) to the builds seen for it, each with the upstream
+# fingerprints it was built from. A build whose upstream tables still have
+# those fingerprints is restored from the cache (hard links) instead of
+# being regenerated. The cache lives in <out>/.build_cache by default.
+
+CACHE_NAME = ".build_cache"
+
+
+def _module_path(module):
+    path = PROJECT_ROOT / Path(*module.split("."))
+    return path.with_suffix(".py") if path.with_suffix(".py").exists() else path / "__init__.py"
+
+
+def _src_imports(path):
+    """Modules under src/ imported anywhere in `path` (including function-level imports)."""
+    found = set()
+    for node in ast.walk(ast.parse(path.read_text())):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names if alias.name.startswith("src."))
+        elif isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src"):
+            found.add(node.module)
+            # `from src.etl import cdc` imports a module, not a name
+            found.update(f"{node.module}.{alias.name}" for alias in node.names
+                         if _module_path(f"{node.module}.{alias.name}").exists())
+    return found
+
+
+def code_version(*modules):
+    """Hash of the source of `modules` and every src/ module they import, transitively."""
+    pending, seen = list(modules), {}
+    while pending:
+        module = pending.pop()
+        path = _module_path(module)
+        if module in seen or not path.exists():
+            continue
+        seen[module] = path
+        pending.extend(_src_imports(path))
+    digest = hashlib.sha256()
+    for module in sorted(seen):
+        digest.update(module.encode())
+        digest.update(seen[module].read_bytes())
+    return digest.hexdigest()
+
+
+def _hash(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+class TracingSource(TableSource):
+    """TableSource that records every upstream table a generator asks for."""
+
+    def __init__(self, raw_dir):
+        super().__init__(raw_dir)
+        self.reads = set()
+
+    def __call__(self, domain, table, columns=None):
+        self.reads.add((domain, table))
+        return super().__call__(domain, table, columns=columns)
+
+
+class BuildCache:
+    """Domain outputs under `out_dir`, cached by code, parameters and upstream fingerprints.
+
+    File ETags are memoized by (size, mtime, inode), so checking a warm
+    lake only stats files; content is hashed once, when it is written.
+    """
+
+    def __init__(self, out_dir, cache_dir=None):
+        self.out_dir = Path(out_dir)
+        self.cache_dir = self.out_dir / CACHE_NAME if cache_dir is None else Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        memo = self.cache_dir / "etags.json"
+        self.etags = json.loads(memo.read_text()) if memo.exists() else {}
+
+    # ---- fingerprints
+
+    def _etag(self, path):
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        cached = self.etags.get(str(path))
+        if cached is None or cached[0] != stamp:
+            cached = self.etags[str(path)] = [stamp, compute_etag(path)]
+        return cached[1]
+
+    def _files(self, domain, table):
+        try:
+            return table_files(domain, table, self.out_dir)
+        except FileNotFoundError:
+            return []
+
+    def _digest(self, files, base):
+        return _hash([[str(p.relative_to(base)), self._etag(p)] for p in files])
+
+    def fingerprint(self, domain, table):
+        """Hash of a table's files under out_dir (None when it does not exist)."""
+        files = self._files(domain, table)
+        return self._digest(files, self.out_dir / domain) if files else None
+
+    # ---- keys
+
+    def base_key(self, domain, **params):
+        modules = [DOMAINS[domain], "src.etl"] + (["src.etl.cdc"] if params.get("cdc") else [])
+        return _hash({"domain": domain, "code": code_version(*modules), "params": params})
+
+    def _index_path(self, domain):
+        return self.cache_dir / domain / "index.json"
+
+    def _index(self, domain):
+        path = self._index_path(domain)
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def lookup(self, domain, base):
+        """The cached build of `domain` for `base` whose upstream tables are unchanged, if any.
+
+        Cached files are hard links, so they are re-checked against the
+        fingerprints they were stored with in case one was edited in place.
+        """
+        for entry in self._index(domain).get(base, []):
+            if any(self.fingerprint(*name.split(".")) != fp for name, fp in entry["upstream"].items()):
+                continue
+            if self._intact(domain, entry):
+                return entry
+        return None
+
+    def _intact(self, domain, entry):
+        cached = self.cache_dir / domain / entry["key"]
+        return all(all((cached / rel).exists() for rel in rels) and
+                   self._digest([cached / rel for rel in rels], cached) == entry["outputs"][table]
+                   for table, rels in entry["files"].items())
+
+    # ---- store / restore
+
+    def store(self, domain, base, reads, tables):
+        """Record the just-written `tables` of `domain`, built from the upstream `reads`."""
+        upstream = {f"{d}.{t}": self.fingerprint(d, t) for d, t in sorted(reads) if d != domain}
+        files = {t: [str(p.relative_to(self.out_dir / domain)) for p in self._files(domain, t)]
+                 for t in tables}
+        outputs = {t: self.fingerprint(domain, t) for t in tables}
+        key = _hash({"base": base, "upstream": upstream, "outputs": outputs})
+
+        target = self.cache_dir / domain / key
+        entry = {"key": key, "upstream": upstream, "files": files, "outputs": outputs}
+        if not self._intact(domain, entry):
+            shutil.rmtree(target, ignore_errors=True)
+            staging = target.with_name(key + ".staging")
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            for rel in (rel for paths in files.values() for rel in paths):
+                _link(self.out_dir / domain / rel, staging / rel)
+            os.replace(staging, target)
+
+        index = self._index(domain)
+        index[base] = [e for e in index.get(base, []) if e["upstream"] != upstream] + [entry]
+        self._index_path(domain).write_text(json.dumps(index, indent=1))
+        return entry
+
+    def _in_place(self, domain, table, rels, cached):
+        base = self.out_dir / domain
+        if self._files(domain, table) != [base / rel for rel in rels]:
+            return False
+        return all((base / rel).samefile(cached / rel) or self._etag(base / rel) == self._etag(cached / rel)
+                   for rel in rels)
+
+    def restore(self, domain, entry):
+        """Put a cached build in place under out_dir; False when it already is."""
+        base = self.out_dir / domain
+        cached = self.cache_dir / domain / entry["key"]
+        if all(self._in_place(domain, t, rels, cached) for t, rels in entry["files"].items()):
+            return False
+        for table, rels in entry["files"].items():
+            for stale in base.glob(f"{table}.csv*"):
+                stale.unlink()
+            shutil.rmtree(base / table, ignore_errors=True)
+            for rel in rels:
+                _link(cached / rel, base / rel)
+        return True
+
+    def save(self):
+        (self.cache_dir / "etags.json").write_text(json.dumps(self.etags))
+
+
+def _link(src, dst):
+    """Hard-link `src` to `dst` (copy across filesystems)."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the domain build cache.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("ls", help="cached builds per domain (default command)")
+    clear = sub.add_parser("clear", help="drop cached builds")
+    clear.add_argument("--domains", nargs="+", choices=list(DOMAINS), default=list(DOMAINS))
+    for command in sub.choices.values():
+        command.add_argument("--out", default=str(RAW_DIR), help="output root the cache belongs to")
+        command.add_argument("--cache-dir", default=None, help="default: <out>/.build_cache")
+    args = parser.parse_args()
+
+    out = Path(getattr(args, "out", RAW_DIR))
+    cache_dir = out / CACHE_NAME if getattr(args, "cache_dir", None) is None else Path(args.cache_dir)
+    if args.command == "clear":
+        for domain in args.domains:
+            shutil.rmtree(cache_dir / domain, ignore_errors=True)
+        (cache_dir / "etags.json").unlink(missing_ok=True)
+        print(f"cleared {', '.join(args.domains)}")
+    else:
+        for domain in DOMAINS:
+            path = cache_dir / domain / "index.json"
+            builds = sum(len(v) for v in json.loads(path.read_text()).values()) if path.exists() else 0
+            print(f"{domain}: {builds} cached build(s)")
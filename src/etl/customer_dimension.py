@@ -0,0 +1,183 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.utils.sampling import unit_hash
+
+# ============================================
+# Attribute domains
+# ============================================
+
+FIRST_NAMES = ["Alex", "Chris", "Sam", "Taylor", "Jordan", "Pat", "Morgan", "Jamie"]
+LAST_NAMES = ["Smith", "Johnson", "Garcia", "Martinez", "Brown", "Lopez", "Davis", "Miller"]
+COUNTRIES = ["Colombia", "Mexico", "USA", "Brazil", "Spain"]
+CITIES = {
+    "Colombia": ["Bogotá", "Medellín", "Cali", "Barranquilla"],
+    "Mexico": ["CDMX", "Guadalajara", "Monterrey"],
+    "USA": ["New York", "Miami", "Los Angeles"],
+    "Brazil": ["São Paulo", "Rio de Janeiro", "Brasilia"],
+    "Spain": ["Madrid", "Barcelona", "Valencia"],
+}
+GENDERS = ["Male", "Female", "Other"]
+AGE_GROUPS = ["18-24", "25-34", "35-44", "45-54", "55+"]
+ECOMMERCE_SEGMENTS = ["New", "Active", "Churn Risk", "VIP"]
+
+CRM_SEGMENTS = ["New", "Active", "Loyal", "At Risk", "Churned"]
+LIFECYCLE_STAGES = ["Lead", "MQL", "Customer", "Active", "Churned"]
+PREFERRED_CHANNELS = ["email", "phone", "whatsapp", "sms", "in_app"]
+
+SIGNUP_START = pd.Timestamp("2022-01-01")
+SIGNUP_DAYS = 730  # within 2 years
+
+
+# ============================================
+# Counter-based draws keyed on customer_id
+# ============================================
+#
+# Each attribute gets its own stream: u = unit_hash(seed, stream,
+# customer_id), the splitmix64 draw the lake sampler also uses.
+# Draws depend only on the id, so ecommerce and CRM get identical
+# attributes for the same customer without sharing state or files, and
+# the result does not depend on row order or batch size.
+
+def _choice_codes(u, n, p=None):
+    """Categorical codes for uniform draws `u` over `n` labels."""
+    if p is None:
+        return np.minimum((u * n).astype(np.int32), n - 1)
+    return np.minimum(np.searchsorted(np.cumsum(p), u, side="right"), n - 1).astype(np.int32)
+
+
+def _categorical(codes, labels):
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def customer_emails(customer_ids):
+    """customer_<id>@example.com as an Arrow string array."""
+    # Arrow string kernels build 10M unique emails ~4x faster than object concat
+    ids = pa.array(np.asarray(customer_ids, dtype=np.int64))
+    return pc.binary_join_element_wise("customer_", pc.cast(ids, pa.string()), "@example.com", "")
+
+
+# ============================================
+# Synthetic email noise
+# ============================================
+
+EMAIL_NOISE = {
+    "clean": 0.5,
+    "case_space": 0.15,     # " Customer_7@Example.com"
+    "plus_tag": 0.1,        # customer_7+promo@example.com
+    "domain_typo": 0.1,     # customer_7@exmple.com
+    "local_typo": 0.1,      # cstomer_7@example.com
+    "transposed": 0.05,     # ucstomer_7@example.com
+}
+
+
+def messy_emails(emails, rng):
+    """The way people retype their email into a lead form, drawn per row.
+
+    `emails` is an Arrow string array, e.g. from customer_emails.
+    """
+    s = emails.combine_chunks() if isinstance(emails, pa.ChunkedArray) else emails
+    local = pc.replace_substring_regex(s, r"@.*$", "")
+    domain = pc.replace_substring_regex(s, r"^[^@]*@", "")
+    variants = {
+        "clean": s,
+        "case_space": pc.binary_join_element_wise(" ", pc.utf8_capitalize(s), ""),
+        "plus_tag": pc.binary_join_element_wise(local, "+promo@", domain, ""),
+        "domain_typo": pc.binary_join_element_wise(
+            local, "@", pc.utf8_slice_codeunits(domain, 0, 2), pc.utf8_slice_codeunits(domain, 3), ""
+        ),
+        "local_typo": pc.binary_join_element_wise(
+            pc.utf8_slice_codeunits(local, 0, 1), pc.utf8_slice_codeunits(local, 2), "@", domain, ""
+        ),
+        "transposed": pc.binary_join_element_wise(
+            pc.utf8_slice_codeunits(local, 1, 2), pc.utf8_slice_codeunits(local, 0, 1),
+            pc.utf8_slice_codeunits(local, 2), "@", domain, ""
+        ),
+    }
+    kind = rng.choice(len(EMAIL_NOISE), len(s), p=list(EMAIL_NOISE.values()))
+    out = s
+    for code, name in enumerate(EMAIL_NOISE):
+        if name != "clean":
+            out = pc.if_else(pa.array(kind == code), variants[name], out)
+    return out
+
+
+# ============================================
+# Bulk generator
+# ============================================
+
+def generate_customer_dimension(customer_ids, seed=42):
+    """Ecommerce customers and CRM profile attributes for `customer_ids`.
+
+    Returns (customers, crm_profile). Every attribute is one array-wide
+    draw; city is sampled conditionally on country through per-country
+    offset/count tables, and labels are built as categoricals from codes.
+    """
+    ids = np.asarray(customer_ids, dtype=np.int64)
+    keys = ids.astype(np.uint64)
+
+    # ---- ecommerce attributes
+    first = _choice_codes(unit_hash(keys, seed, 1), len(FIRST_NAMES))
+    last = _choice_codes(unit_hash(keys, seed, 2), len(LAST_NAMES))
+    country = _choice_codes(unit_hash(keys, seed, 3), len(COUNTRIES))
+
+    # city | country: flat city table + offset/size of each country's block
+    city_labels = [c for k in COUNTRIES for c in CITIES[k]]
+    city_counts = np.array([len(CITIES[k]) for k in COUNTRIES])
+    city_offsets = np.r_[0, np.cumsum(city_counts)[:-1]]
+    city = city_offsets[country] + np.minimum(
+        (unit_hash(keys, seed, 4) * city_counts[country]).astype(np.int32),
+        city_counts[country] - 1,
+    )
+
+    signup_days = (unit_hash(keys, seed, 5) * SIGNUP_DAYS).astype(np.int64)
+    signup_date = SIGNUP_START.to_datetime64() + signup_days.astype("timedelta64[D]")
+
+    full_name_labels = [f"{f} {l}" for f in FIRST_NAMES for l in LAST_NAMES]
+    customers = pd.DataFrame({
+        "customer_id": ids,
+        "first_name": _categorical(first, FIRST_NAMES),
+        "last_name": _categorical(last, LAST_NAMES),
+        "full_name": _categorical(first * len(LAST_NAMES) + last, full_name_labels),
+        "email": pd.arrays.ArrowStringArray(customer_emails(ids)),
+        "signup_date": signup_date.astype("datetime64[ns]"),
+        "country": _categorical(country, COUNTRIES),
+        "city": _categorical(city, city_labels),
+        "gender": _categorical(_choice_codes(unit_hash(keys, seed, 6), len(GENDERS)), GENDERS),
+        "age_group": _categorical(_choice_codes(unit_hash(keys, seed, 7), len(AGE_GROUPS)), AGE_GROUPS),
+        "segment": _categorical(
+            _choice_codes(unit_hash(keys, seed, 8), len(ECOMMERCE_SEGMENTS)), ECOMMERCE_SEGMENTS
+        ),
+    })
+
+    # ---- CRM attributes (same ids, same pass)
+    crm_profile = pd.DataFrame({
+        "customer_id": ids,
+        "lifecycle_stage": _categorical(
+            _choice_codes(unit_hash(keys, seed, 9), len(LIFECYCLE_STAGES)), LIFECYCLE_STAGES
+        ),
+        "segment": _categorical(_choice_codes(unit_hash(keys, seed, 10), len(CRM_SEGMENTS)), CRM_SEGMENTS),
+        "nps_score": _choice_codes(unit_hash(keys, seed, 11), 11).astype(np.int8),  # 0–10
+        "preferred_channel": _categorical(
+            _choice_codes(unit_hash(keys, seed, 12), len(PREFERRED_CHANNELS)), PREFERRED_CHANNELS
+        ),
+        "consent_marketing": _choice_codes(unit_hash(keys, seed, 13), 2, p=[0.2, 0.8]).astype(np.int8),
+    })
+
+    return customers, crm_profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bulk customer dimension.")
+    parser.add_argument("--customers", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    customers, crm_profile = generate_customer_dimension(np.arange(1, args.customers + 1))
+    elapsed = time.perf_counter() - t0
+    print(f"{args.customers:,} customers (ecommerce + CRM attributes) in {elapsed:.2f}s")
@@ -1,150 +1,177 @@
 import pandas as pd
 import numpy as np
 
-np.random.seed(42)
-
-# ---------------------------
-# 1. Chart of Accounts (COA)
-# ---------------------------
-coa = pd.DataFrame({
-    "account_id": [1000, 2000, 3000, 4000, 5000],
-    "account_name": [
-        "Cash",
-        "Accounts Receivable",
-        "Accounts Payable",
-        "Revenue",
-        "Operating Expenses"
-    ],
-    "category": [
-        "Asset",
-        "Asset",
-        "Liability",
-        "Revenue",
-        "Expense"
-    ]
-})
-
-
-# ---------------------------
-# 2. Vendors
-# ---------------------------
-vendor_ids = np.arange(1, 51)
-vendors = pd.DataFrame({
-    "vendor_id": vendor_ids,
-    "vendor_name": [f"Vendor_{i}" for i in vendor_ids],
-    "category": np.random.choice(["Supplies", "Marketing", "Technology", "HR"], len(vendor_ids)),
-    "payment_terms": np.random.choice(["Net 30", "Net 45", "Net 60"], len(vendor_ids))
-})
-
-
-# ---------------------------
-# 3. Orders (fact)
-# ---------------------------
-num_orders = 2000
-orders = pd.DataFrame({
-    "order_id": np.arange(1, num_orders + 1),
-    "customer_id": np.random.randint(1, 1000, num_orders),
-    "order_date": pd.date_range("2023-01-01", periods=num_orders, freq="h"),
-    "order_amount": np.round(np.random.uniform(20, 1000, num_orders), 2),
-    "status": np.random.choice(["completed", "pending", "canceled"], num_orders)
-})
-
-
-# ---------------------------
-# 4. Invoices
-# ---------------------------
-invoice_ids = np.arange(1, num_orders + 1)
-
-invoices = pd.DataFrame({
-    "invoice_id": invoice_ids,
-    "order_id": invoice_ids,
-    "invoice_date": orders["order_date"] + pd.to_timedelta(np.random.randint(1,5, num_orders), unit="D"),
-    "due_date": orders["order_date"] + pd.to_timedelta(np.random.randint(30,45, num_orders), unit="D"),
-    "amount_due": orders["order_amount"],
-    "tax": orders["order_amount"] * 0.19,
-    "discount": np.round(np.random.uniform(0, 50, num_orders), 2),
-    "total_amount": lambda df: df["amount_due"] + df["tax"] - df["discount"],
-    "status": np.random.choice(["paid", "unpaid", "partial"], num_orders)
-})
-
-# compute final total
-invoices["total_amount"] = invoices["amount_due"] + invoices["tax"] - invoices["discount"]
-
-
-# ---------------------------
-# 5. Payments (fact)
-# ---------------------------
-payments = invoices[invoices["status"] == "paid"].copy()
-payments["payment_id"] = np.arange(1, len(payments) + 1)
-payments["payment_date"] = payments["invoice_date"] + pd.to_timedelta(np.random.randint(1,30, len(payments)), unit="D")
-payments["amount_paid"] = payments["total_amount"]
-
-
-# ---------------------------
-# 6. Expenses (fact)
-# ---------------------------
-num_expenses = 1000
-expenses = pd.DataFrame({
-    "expense_id": np.arange(1, num_expenses + 1),
-    "vendor_id": np.random.choice(vendor_ids, num_expenses),
-    "expense_date": pd.date_range("2023-01-01", periods=num_expenses, freq="12h"),
-    "amount": np.round(np.random.uniform(50, 8000, num_expenses), 2),
-    "cost_center": np.random.choice(["Marketing", "Operations", "Tech", "HR"], num_expenses),
-    "account_id": 5000  # Operating Expenses
-})
-
-
-# ---------------------------
-# 7. General Ledger (GL Transactions)
-# ---------------------------
-gl = []
-
-# revenue entries
-for _, row in invoices.iterrows():
-    gl.append({
-        "gl_id": len(gl) + 1,
-        "account_id": 4000,  # Revenue
-        "transaction_date": row["invoice_date"],
-        "amount": row["total_amount"]
-    })
-    gl.append({
-        "gl_id": len(gl) + 1,
-        "account_id": 2000,  # Accounts Receivable
-        "transaction_date": row["invoice_date"],
-        "amount": row["total_amount"]
+from src.utils.file_io import RAW_DIR, TableSource, save_tables
+from src.etl.arrivals import (
+    ArrivalModel, BUSINESS_DAILY, BUSINESS_WEEKLY, RETAIL_DAILY, RETAIL_WEEKLY,
+    campaign_calendar, promos_from_campaigns,
+)
+from src.etl.invoice_lifecycle import collect_invoices
+
+DOMAIN = "finance"
+AS_OF = "2023-10-31"  # payments and write-offs after this date have not happened yet
+
+
+def generate(source=None, seed=42):
+    """Finance domain tables as {table: DataFrame}, built in memory.
+
+    Upstream tables come from `source` (default: data/raw on disk); nothing
+    is written here.
+    """
+    source = TableSource() if source is None else source
+    np.random.seed(seed)
+
+    # Campaign calendar drives order promo spikes. It is the calendar marketing
+    # builds its campaigns on, not marketing's output: marketing runs after
+    # finance and reads its orders.
+    campaigns = campaign_calendar()
+
+    # ---------------------------
+    # 1. Chart of Accounts (COA)
+    # ---------------------------
+    coa = pd.DataFrame({
+        "account_id": [1000, 2000, 3000, 4000, 5000],
+        "account_name": [
+            "Cash",
+            "Accounts Receivable",
+            "Accounts Payable",
+            "Revenue",
+            "Operating Expenses"
+        ],
+        "category": [
+            "Asset",
+            "Asset",
+            "Liability",
+            "Revenue",
+            "Expense"
+        ]
     })
 
-# expense entries
-for _, row in expenses.iterrows():
-    gl.append({
-        "gl_id": len(gl) + 1,
-        "account_id": 5000,  # Operating Expenses
-        "transaction_date": row["expense_date"],
-        "amount": -row["amount"]
+
+    # ---------------------------
+    # 2. Vendors
+    # ---------------------------
+    vendor_ids = np.arange(1, 51)
+    vendors = pd.DataFrame({
+        "vendor_id": vendor_ids,
+        "vendor_name": [f"Vendor_{i}" for i in vendor_ids],
+        "category": np.random.choice(["Supplies", "Marketing", "Technology", "HR"], len(vendor_ids)),
+        "payment_terms": np.random.choice(["Net 30", "Net 45", "Net 60"], len(vendor_ids))
     })
-    gl.append({
-        "gl_id": len(gl) + 1,
-        "account_id": 3000,  # Accounts Payable
-        "transaction_date": row["expense_date"],
-        "amount": row["amount"]
+
+
+    # ---------------------------
+    # 3. Orders (fact)
+    # ---------------------------
+    num_orders = 2000
+
+    # arrivals follow daily/weekly seasonality, mild growth and campaign spikes
+    order_arrivals = ArrivalModel(
+        RETAIL_DAILY, RETAIL_WEEKLY, trend=0.15, promos=promos_from_campaigns(campaigns)
+    )
+
+    orders = pd.DataFrame({
+        "order_id": np.arange(1, num_orders + 1),
+        "customer_id": np.random.randint(1, 1000, num_orders),
+        "order_date": order_arrivals.sample("2023-01-01", "2023-07-01", num_orders),
+        "order_amount": np.round(np.random.uniform(20, 1000, num_orders), 2),
+        "status": np.random.choice(["completed", "pending", "canceled"], num_orders)
     })
 
-gl_transactions = pd.DataFrame(gl)
 
+    # ---------------------------
+    # 4. Invoices
+    # ---------------------------
+    invoice_ids = np.arange(1, num_orders + 1)
+
+    invoices = pd.DataFrame({
+        "invoice_id": invoice_ids,
+        "order_id": invoice_ids,
+        "invoice_date": orders["order_date"] + pd.to_timedelta(np.random.randint(1,5, num_orders), unit="D"),
+        "due_date": orders["order_date"] + pd.to_timedelta(np.random.randint(30,45, num_orders), unit="D"),
+        "amount_due": orders["order_amount"],
+        "tax": np.round(orders["order_amount"] * 0.19, 2),
+        "discount": np.round(np.random.uniform(0, 50, num_orders), 2),
+        "total_amount": lambda df: df["amount_due"] + df["tax"] - df["discount"],
+    })
+
+    # compute final total
+    invoices["total_amount"] = invoices["amount_due"] + invoices["tax"] - invoices["discount"]
+
+
+    # ---------------------------
+    # 5. Payments (fact) + AR subledger
+    # ---------------------------
+    # installments, partial/late payments and write-offs; status follows from them
+    invoices, payments, ar_subledger = collect_invoices(invoices, AS_OF, np.random)
+
+
+    # ---------------------------
+    # 6. Expenses (fact)
+    # ---------------------------
+    num_expenses = 1000
+    expenses = pd.DataFrame({
+        "expense_id": np.arange(1, num_expenses + 1),
+        "vendor_id": np.random.choice(vendor_ids, num_expenses),
+        "expense_date": ArrivalModel(BUSINESS_DAILY, BUSINESS_WEEKLY).sample(
+            "2023-01-01", pd.Timestamp("2023-01-01") + pd.Timedelta(hours=12 * num_expenses), num_expenses
+        ),
+        "amount": np.round(np.random.uniform(50, 8000, num_expenses), 2),
+        "cost_center": np.random.choice(["Marketing", "Operations", "Tech", "HR"], num_expenses),
+        "account_id": 5000  # Operating Expenses
+    })
 
-# ---------------------------
-# SAVE ALL DATA
-# ---------------------------
-import os
-path = "../../data/raw/finance/"
-os.makedirs(path, exist_ok=True)
 
-coa.to_csv(path + "chart_of_accounts.csv", index=False)
-vendors.to_csv(path + "vendors.csv", index=False)
-orders.to_csv(path + "orders.csv", index=False)
-invoices.to_csv(path + "invoices.csv", index=False)
-payments.to_csv(path + "payments.csv", index=False)
-expenses.to_csv(path + "expenses.csv", index=False)
-gl_transactions.to_csv(path + "gl_transactions.csv", index=False)
+    # ---------------------------
+    # 7. General Ledger (GL Transactions)
+    # ---------------------------
+    # double entries as (account, date, amount) pairs, interleaved row by row;
+    # source_type/source_id point back at the document that caused the posting
+    payment_dates = payments["payment_date"].to_numpy()
+    written_off = ar_subledger[ar_subledger["entry_type"] == "write_off"]
+    postings = [
+        # invoice issued: revenue + accounts receivable
+        ("invoice", invoices["invoice_id"].to_numpy(), 4000, 2000, invoices["invoice_date"].to_numpy(),
+         invoices["total_amount"].to_numpy(), invoices["total_amount"].to_numpy()),
+        # expense booked: operating expenses + accounts payable
+        ("expense", expenses["expense_id"].to_numpy(), 5000, 3000, expenses["expense_date"].to_numpy(),
+         -expenses["amount"].to_numpy(), expenses["amount"].to_numpy()),
+        # cash received: cash in, receivable cleared
+        ("payment", payments["payment_id"].to_numpy(), 1000, 2000, payment_dates,
+         payments["amount_paid"].to_numpy(), -payments["amount_paid"].to_numpy()),
+        # bad debt: expense, receivable cleared
+        ("write_off", written_off["invoice_id"].to_numpy(), 5000, 2000, written_off["entry_date"].to_numpy(),
+         written_off["amount"].to_numpy(), written_off["amount"].to_numpy()),
+    ]
+    accounts, dates, amounts, source_types, source_ids = [], [], [], [], []
+    for source_type, source_id, debit_account, credit_account, when, first, second in postings:
+        accounts.append(np.column_stack([np.full(len(when), debit_account), np.full(len(when), credit_account)]).ravel())
+        dates.append(np.column_stack([when, when]).ravel())
+        amounts.append(np.column_stack([first, second]).ravel())
+        source_types.append(np.full(2 * len(when), source_type))
+        source_ids.append(np.repeat(source_id, 2))
+
+    gl_transactions = pd.DataFrame({
+        "gl_id": np.arange(1, sum(len(a) for a in accounts) + 1),
+        "account_id": np.concatenate(accounts),
+        "transaction_date": np.concatenate(dates),
+        "amount": np.concatenate(amounts),
+        "source_type": np.concatenate(source_types),
+        "source_id": np.concatenate(source_ids),
+    })
 
-print("Full finance domain generated successfully.")
+    return {
+        "chart_of_accounts": coa,
+        "vendors": vendors,
+        "orders": orders,
+        "invoices": invoices,
+        "payments": payments,
+        "ar_subledger": ar_subledger,
+        "expenses": expenses,
+        "gl_transactions": gl_transactions,
+    }
+
+
+if __name__ == "__main__":
+    save_tables(RAW_DIR / DOMAIN, generate())
+    print("Full finance domain generated successfully.")
@@ -0,0 +1,275 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# Invoice-to-cash lifecycle
+# ============================================
+#
+# Every invoice gets a payment plan (one payment or 2–4 monthly
+# installments), a payer profile (on time / late / very late), and may split
+# installments into two partial payments or default part-way and be
+# written off. All schedules are expanded with repeat/cumsum: position k of
+# an invoice is installment k // pieces, piece k % pieces. Dates are
+# non-decreasing within an invoice by construction, so "payments received
+# by as_of" and "payments before default" are both prefixes and nothing
+# needs sorting. Money is handled in integer cents.
+
+PAYMENT_PLANS = ["full", "installments"]
+ENTRY_TYPES = ["invoice", "payment", "write_off"]
+INVOICE_STATUSES = ["unpaid", "partial", "paid", "written_off"]
+
+INSTALLMENT_DAYS = 30
+PAYER_PROFILES = {          # share, delay distribution around each due date (days)
+    "on_time": 0.55,        # 0–10 days early
+    "late": 0.35,           # exponential, mean 20 days
+    "very_late": 0.10,      # exponential, mean 60 days
+}
+NS_PER_DAY = 86_400 * 10**9
+
+
+def _within(counts):
+    """0..count-1 inside each group of a repeat(…, counts) expansion."""
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def simulate_collections(invoice_date, due_date, total_amount, as_of, rng, installment_share=0.3,
+                         max_installments=4, split_share=0.15, default_share=0.06, write_off_days=90):
+    """Payment events and per-invoice collection state.
+
+    Returns (payments, state). `payments` holds positional invoice rows
+    (`invoice_row`), dates and cents for the payments received by `as_of`;
+    `state` is one row per invoice with the plan, amounts, status and the
+    date it closed (last payment or write-off). Invoices with a total of
+    zero or less (discount >= amount) are clamped to zero: nothing is
+    scheduled and they close as paid on their invoice date.
+    """
+    n = len(total_amount)
+    issued = np.asarray(invoice_date, dtype="datetime64[ns]").astype(np.int64)
+    due = np.asarray(due_date, dtype="datetime64[ns]").astype(np.int64)
+    total_cents = np.maximum(np.round(np.asarray(total_amount, dtype=np.float64) * 100).astype(np.int64), 0)
+    settled = total_cents == 0
+    cutoff = pd.Timestamp(as_of).value
+
+    # ---- per-invoice draws
+    plan = (rng.random_sample(n) < installment_share).astype(np.int8)
+    installments = np.where(plan == 1, rng.randint(2, max_installments + 1, n), 1).astype(np.int64)
+    pieces = np.where(rng.random_sample(n) < split_share, 2, 1).astype(np.int64)
+    split_fraction = rng.uniform(0.2, 0.8, n)
+    split_gap = rng.randint(4, 21, n)
+
+    profile = rng.choice(len(PAYER_PROFILES), n, p=list(PAYER_PROFILES.values()))
+    delay = np.select(
+        [profile == 0, profile == 1],
+        [-rng.uniform(0, 10, n), rng.exponential(20, n)],
+        rng.exponential(60, n),
+    )
+
+    # ---- expand to one row per scheduled payment
+    per_invoice = np.where(settled, 0, installments * pieces)
+    row = np.repeat(np.arange(n), per_invoice)
+    k = _within(per_invoice)
+    inst = k // pieces[row]
+    piece = k % pieces[row]
+
+    base = total_cents // installments
+    inst_cents = np.where(inst == installments[row] - 1, total_cents[row] - base[row] * (installments[row] - 1),
+                          base[row])
+    first_piece = np.round(inst_cents * split_fraction[row]).astype(np.int64)
+    cents = np.where(pieces[row] == 1, inst_cents, np.where(piece == 0, first_piece, inst_cents - first_piece))
+
+    # jitter (< 3 days) is smaller than the split gap (>= 4) and the gap to the
+    # next installment, so dates never go backwards inside an invoice
+    inst_due = due[row] + inst * INSTALLMENT_DAYS * NS_PER_DAY
+    jitter = rng.uniform(0, 3, len(row))
+    offset_days = delay[row] + jitter + piece * split_gap[row]
+    paid_at = np.maximum(inst_due + (offset_days * NS_PER_DAY).astype(np.int64), issued[row])
+    paid_at = paid_at // 10**9 * 10**9
+
+    # ---- defaulters stop after a random number of payments (and never pay after
+    # the write-off); nothing after as_of is received
+    final_due = due + (installments - 1) * INSTALLMENT_DAYS * NS_PER_DAY
+    write_off_at = final_due + write_off_days * NS_PER_DAY
+    defaults = rng.random_sample(n) < default_share
+    stop = np.where(defaults, (rng.random_sample(n) * per_invoice).astype(np.int64), per_invoice)
+    received = (k < stop[row]) & (paid_at <= cutoff) & ~(defaults[row] & (paid_at > write_off_at[row]))
+
+    payments = {
+        "invoice_row": row[received],
+        "payment_date": paid_at[received],
+        "cents": cents[received],
+        "installment_no": (inst[received] + 1).astype(np.int8),
+        "days_late": ((paid_at[received] - inst_due[received]) // NS_PER_DAY).astype(np.int16),
+    }
+
+    paid_cents = np.bincount(payments["invoice_row"], weights=payments["cents"], minlength=n).astype(np.int64)
+    last_paid = np.full(n, np.iinfo(np.int64).min)
+    np.maximum.at(last_paid, payments["invoice_row"], payments["payment_date"])
+    written_off = defaults & (paid_cents < total_cents) & (write_off_at <= cutoff)
+    write_off_cents = np.where(written_off, total_cents - paid_cents, 0)
+
+    status = np.select(
+        [written_off, paid_cents >= total_cents, paid_cents > 0],
+        [INVOICE_STATUSES.index("written_off"), INVOICE_STATUSES.index("paid"), INVOICE_STATUSES.index("partial")],
+        INVOICE_STATUSES.index("unpaid"),
+    )
+    closed = np.where(written_off, write_off_at, np.where(paid_cents >= total_cents, last_paid, np.iinfo(np.int64).min))
+    closed = np.where(settled, issued, closed)
+
+    state = {
+        "payment_plan": plan,
+        "installments": installments.astype(np.int8),
+        "total_cents": total_cents,
+        "paid_cents": paid_cents,
+        "write_off_cents": write_off_cents,
+        "write_off_date": np.where(written_off, write_off_at, np.iinfo(np.int64).min),
+        "status": status.astype(np.int8),
+        "closed_date": closed,
+    }
+    return payments, state
+
+
+def ar_subledger(invoice_date, due_date, payments, state):
+    """AR entries per invoice (invoice, payments, write-off) with a running balance.
+
+    Rows are laid out invoice by invoice by position (payments are already
+    in date order), and the balance is a grouped cumulative sum: one global
+    cumsum minus the cumsum before each invoice's first entry.
+    """
+    n = len(state["total_cents"])
+    issued = np.asarray(invoice_date, dtype="datetime64[ns]").astype(np.int64)
+    due = np.asarray(due_date, dtype="datetime64[ns]").astype(np.int64)
+
+    pay_row = payments["invoice_row"]
+    pay_count = np.bincount(pay_row, minlength=n)
+    has_write_off = state["write_off_cents"] > 0
+    entries = 1 + pay_count + has_write_off
+    start = np.cumsum(entries) - entries
+
+    size = int(entries.sum())
+    row = np.repeat(np.arange(n), entries)
+    entry_type = np.zeros(size, dtype=np.int8)
+    cents = np.empty(size, dtype=np.int64)
+    when = np.empty(size, dtype=np.int64)
+
+    cents[start] = state["total_cents"]
+    when[start] = issued
+
+    pay_pos = start[pay_row] + 1 + _within(pay_count)
+    entry_type[pay_pos] = ENTRY_TYPES.index("payment")
+    cents[pay_pos] = -payments["cents"]
+    when[pay_pos] = payments["payment_date"]
+
+    wo_pos = (start + entries - 1)[has_write_off]
+    entry_type[wo_pos] = ENTRY_TYPES.index("write_off")
+    cents[wo_pos] = -state["write_off_cents"][has_write_off]
+    when[wo_pos] = state["write_off_date"][has_write_off]
+
+    running = np.cumsum(cents)
+    balance = running - np.repeat(running[start] - cents[start], entries)
+
+    return {
+        "invoice_row": row,
+        "entry_date": when,
+        "entry_type": entry_type,
+        "cents": cents,
+        "balance_cents": balance,
+        "days_past_due": ((when - due[row]) // NS_PER_DAY).astype(np.int32),
+    }
+
+
+# ============================================
+# DataFrame wrappers used by the finance generator
+# ============================================
+
+def _dates(ns):
+    out = np.asarray(ns, dtype=np.int64).astype("datetime64[ns]")
+    out[np.asarray(ns) == np.iinfo(np.int64).min] = np.datetime64("NaT")
+    return out
+
+
+def collect_invoices(invoices, as_of, rng, **kwargs):
+    """(invoices with lifecycle columns, payments, ar_subledger) DataFrames."""
+    payments, state = simulate_collections(
+        invoices["invoice_date"], invoices["due_date"], invoices["total_amount"], as_of, rng, **kwargs
+    )
+    ledger = ar_subledger(invoices["invoice_date"], invoices["due_date"], payments, state)
+    invoice_ids = invoices["invoice_id"].to_numpy()
+
+    invoices = invoices.copy()
+    invoices["status"] = pd.Categorical.from_codes(state["status"], INVOICE_STATUSES)
+    invoices["payment_plan"] = pd.Categorical.from_codes(state["payment_plan"], PAYMENT_PLANS)
+    invoices["installments"] = state["installments"]
+    invoices["amount_paid"] = state["paid_cents"] / 100
+    invoices["written_off_amount"] = state["write_off_cents"] / 100
+    invoices["balance"] = (state["total_cents"] - state["paid_cents"] - state["write_off_cents"]) / 100
+    invoices["closed_date"] = _dates(state["closed_date"])
+
+    payments = pd.DataFrame({
+        "payment_id": np.arange(1, len(payments["cents"]) + 1),
+        "invoice_id": invoice_ids[payments["invoice_row"]],
+        "order_id": invoices["order_id"].to_numpy()[payments["invoice_row"]],
+        "payment_date": payments["payment_date"].astype("datetime64[ns]"),
+        "installment_no": payments["installment_no"],
+        "days_late": payments["days_late"],
+        "amount_paid": payments["cents"] / 100,
+    })
+
+    ledger = pd.DataFrame({
+        "ar_entry_id": np.arange(1, len(ledger["cents"]) + 1),
+        "invoice_id": invoice_ids[ledger["invoice_row"]],
+        "entry_date": ledger["entry_date"].astype("datetime64[ns]"),
+        "entry_type": pd.Categorical.from_codes(ledger["entry_type"], ENTRY_TYPES),
+        "amount": ledger["cents"] / 100,
+        "balance": ledger["balance_cents"] / 100,
+        "days_past_due": ledger["days_past_due"],
+    })
+    return invoices, payments, ledger
+
+
+def benchmark_lifecycle(num_invoices=50_000_000, chunk_invoices=5_000_000, seed=42):
+    """Simulate collections + AR subledger for `num_invoices`, chunk by chunk.
+
+    Invoices are independent, so chunks by invoice range concatenate into
+    the full result; each chunk checks that the last running balance of
+    every invoice equals total - paid - written off.
+    """
+    rng = np.random.RandomState(seed)
+    start_ns = pd.Timestamp("2022-01-01").value
+    span_ns = 730 * NS_PER_DAY
+    as_of = "2024-06-30"
+
+    t0 = time.perf_counter()
+    totals = {"payments": 0, "entries": 0, "written_off": 0}
+    for start in range(0, num_invoices, chunk_invoices):
+        n = min(chunk_invoices, num_invoices - start)
+        issued = start_ns + (rng.random_sample(n) * span_ns).astype(np.int64) // NS_PER_DAY * NS_PER_DAY
+        due = issued + rng.randint(30, 45, n) * NS_PER_DAY
+        amount = np.round(rng.uniform(20, 1200, n), 2)
+
+        payments, state = simulate_collections(issued, due, amount, as_of, rng)
+        ledger = ar_subledger(issued, due, payments, state)
+
+        last = np.cumsum(np.bincount(ledger["invoice_row"], minlength=n)) - 1
+        expected = state["total_cents"] - state["paid_cents"] - state["write_off_cents"]
+        assert np.array_equal(ledger["balance_cents"][last], expected), "AR balance mismatch"
+
+        totals["payments"] += len(payments["cents"])
+        totals["entries"] += len(ledger["cents"])
+        totals["written_off"] += int((state["write_off_cents"] > 0).sum())
+    elapsed = time.perf_counter() - t0
+
+    print(f"{num_invoices:,} invoices -> {totals['payments']:,} payments, "
+          f"{totals['entries']:,} AR entries, {totals['written_off']:,} write-offs in {elapsed:.1f}s "
+          f"({num_invoices / elapsed / 1e6:.2f}M invoices/s, balances verified)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the invoice-to-cash simulator and AR subledger.")
+    parser.add_argument("--invoices", type=int, default=50_000_000)
+    parser.add_argument("--chunk", type=int, default=5_000_000)
+    args = parser.parse_args()
+    benchmark_lifecycle(args.invoices, args.chunk)
@@ -0,0 +1,144 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# SCD2 price/cost history for the product catalog
+# ============================================
+
+
+def generate_price_history(products, start="2023-01-01", end="2023-12-31", mean_changes=4,
+                           price_volatility=0.06, cost_volatility=0.03):
+    """One row per (product, price version) with active_from/active_to ranges.
+
+    Everything is drawn as flat arrays: versions per product are repeated
+    out, change dates are sorted inside each product with one lexsort and
+    the price/cost random walks are grouped cumulative sums of log returns.
+    Version 0 of every product starts at `start` with its catalog price.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    span_days = max(1, (end - start).days)
+
+    product_ids = products["product_id"].to_numpy()
+    num_products = len(product_ids)
+    group = np.repeat(np.arange(num_products), 1 + np.random.poisson(mean_changes, num_products))
+
+    # change days; version 0 is pinned to day 0, duplicates inside a product are dropped
+    offsets = np.random.randint(1, span_days + 1, len(group))
+    is_first = np.r_[True, group[1:] != group[:-1]]
+    offsets[is_first] = 0
+    order = np.lexsort((offsets, group))
+    group, offsets = group[order], offsets[order]
+    keep = np.r_[True, (group[1:] != group[:-1]) | (offsets[1:] != offsets[:-1])]
+    group, offsets = group[keep], offsets[keep]
+
+    is_first = np.r_[True, group[1:] != group[:-1]]
+    starts = np.flatnonzero(is_first)
+    sizes = np.diff(np.r_[starts, len(group)])
+
+    def grouped_walk(volatility, drift):
+        steps = np.random.normal(drift, volatility, len(group))
+        steps[is_first] = 0.0
+        walk = np.cumsum(steps)
+        return np.exp(walk - np.repeat(walk[starts], sizes))
+
+    base_price = products["list_price"].to_numpy()[group]
+    base_cost = products["base_cost"].to_numpy()[group]
+    cost = base_cost * grouped_walk(cost_volatility, 0.005)
+    price = np.maximum(base_price * grouped_walk(price_volatility, 0.0), cost * 1.05)
+
+    active_from = start + pd.to_timedelta(offsets, unit="D")
+    active_to = pd.Series(active_from).shift(-1).where(~np.r_[is_first[1:], True])
+
+    return pd.DataFrame({
+        "price_version_id": np.arange(1, len(group) + 1, dtype=np.int32),
+        "product_id": product_ids[group],
+        "list_price": np.round(price, 2),
+        "base_cost": np.round(cost, 2),
+        "margin_pct": np.round((price - cost) / price * 100, 2),
+        "active_from": active_from,
+        "active_to": active_to.to_numpy(),
+    })
+
+
+# ============================================
+# As-of lookup: (product_id, event time) -> price version
+# ============================================
+
+
+def asof_indexer(history, product_ids, event_times):
+    """Row position in `history` of the version active for each event.
+
+    (product_id, active_from) is packed into one sorted int64 key so the
+    whole join is a single np.searchsorted over sorted needles. Events dated
+    before a product's first version fall back to that first version.
+    """
+    hist_pid = history["product_id"].to_numpy(np.int64)
+    hist_t = history["active_from"].to_numpy("datetime64[s]").astype(np.int64)
+    event_pid = np.asarray(product_ids, dtype=np.int64)
+    event_t = np.asarray(event_times, dtype="datetime64[s]").astype(np.int64)
+
+    origin = min(hist_t.min(), event_t.min())
+    hist_key = (hist_pid << 32) | (hist_t - origin)
+    event_key = (event_pid << 32) | (event_t - origin)
+
+    order = None
+    if np.any(hist_key[1:] < hist_key[:-1]):
+        order = np.argsort(hist_key, kind="stable")
+        hist_key, hist_pid = hist_key[order], hist_pid[order]
+
+    # binary search is far cheaper on ascending needles (cache-friendly probes)
+    event_order = None
+    if np.any(event_key[1:] < event_key[:-1]):
+        event_order = np.argsort(event_key)
+        event_key, event_pid = event_key[event_order], event_pid[event_order]
+
+    idx = np.searchsorted(hist_key, event_key, side="right") - 1
+    matched = (idx >= 0) & (hist_pid[np.clip(idx, 0, None)] == event_pid)
+    if not matched.all():
+        first = np.searchsorted(hist_key, event_pid << 32, side="left")
+        known = (first < len(hist_pid)) & (hist_pid[np.clip(first, None, len(hist_pid) - 1)] == event_pid)
+        if not known[~matched].all():
+            missing = np.unique(event_pid[~matched & ~known])[:10]
+            raise ValueError(f"No price history for product_id(s) {missing.tolist()}")
+        idx = np.where(matched, idx, first)
+
+    if order is not None:
+        idx = order[idx]
+    if event_order is not None:
+        unsorted = np.empty_like(idx)
+        unsorted[event_order] = idx
+        idx = unsorted
+    return idx
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SCD2 generation and as-of joins.")
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--lines", type=int, default=20_000_000)
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    catalog = pd.DataFrame({
+        "product_id": np.arange(1, args.products + 1),
+        "base_cost": np.random.uniform(5, 200, args.products),
+    })
+    catalog["list_price"] = catalog["base_cost"] * np.random.uniform(1.2, 2.5, args.products)
+
+    t0 = time.perf_counter()
+    history = generate_price_history(catalog)
+    gen_s = time.perf_counter() - t0
+
+    line_pids = np.random.randint(1, args.products + 1, args.lines)
+    line_times = np.datetime64("2023-01-01") + np.random.randint(0, 365 * 24 * 3600, args.lines).astype("timedelta64[s]")
+
+    t0 = time.perf_counter()
+    idx = asof_indexer(history, line_pids, line_times)
+    unit_price = history["list_price"].to_numpy()[idx]
+    join_s = time.perf_counter() - t0
+
+    print(f"{len(history):,} price versions generated in {gen_s:.2f}s")
+    print(f"{args.lines:,} order lines priced in {join_s:.2f}s "
+          f"({args.lines / join_s / 1e6:.1f}M lines/s)")
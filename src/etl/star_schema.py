@@ -0,0 +1,547 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.utils.file_io import PROCESSED_DIR, RAW_DIR, TableSource, compute_etag
+from src.utils.lake_query import LAKE_DIR, LakeReader
+
+# ============================================
+# Star schema (gold layer) under data/processed/warehouse
+# ============================================
+#
+# dims/dim_<name>.parquet              one file per dimension, row 0 = "Unknown"
+# facts/<fact>/year=YYYY/month=MM/     date-partitioned fact tables
+# facts/<fact>/_manifest.json          fingerprint per partition
+# facts/<fact>/_inputs.json            fingerprint of the inputs of each partition
+#
+# Surrogate keys are plain int32s assigned with pd.factorize and resolved
+# with dense natural-key -> surrogate-key arrays, so facts never go through
+# a merge. Keys are stable across builds: existing members keep theirs and
+# new members are appended. Facts are built from the month-partitioned lake:
+# a month is read and rebuilt only when the lake partitions it depends on
+# (or the small tables and dimension keys it looks up) changed, and a fact
+# partition is rewritten only when the fingerprint of its rows changes.
+
+WAREHOUSE_DIR = PROCESSED_DIR / "warehouse"
+UNKNOWN_KEY = 0
+
+
+# ============================================
+# Surrogate keys
+# ============================================
+
+def assign_surrogate_keys(natural_keys, previous=None):
+    """(natural keys, surrogate keys), both sorted by natural key.
+
+    `previous` is the (natural, surrogate) pair of the last build; its
+    members keep their keys (even if gone from the source) and unseen
+    natural keys get max + 1, max + 2, ...
+    """
+    _, uniques = pd.factorize(np.asarray(natural_keys, dtype=np.int64), sort=True)
+    uniques = np.asarray(uniques, dtype=np.int64)
+    if previous is None or not len(previous[0]):
+        return uniques, np.arange(1, len(uniques) + 1, dtype=np.int32)
+
+    prev_natural, prev_surrogate = (np.asarray(a, dtype=np.int64) for a in previous)
+    new = uniques[~np.isin(uniques, prev_natural)]
+    natural = np.r_[prev_natural, new]
+    surrogate = np.r_[prev_surrogate, prev_surrogate.max(initial=0) + 1 + np.arange(len(new))]
+    order = np.argsort(natural, kind="stable")
+    return natural[order], surrogate[order].astype(np.int32)
+
+
+class KeyLookup:
+    """Dense natural-key -> value array (ids are small positive ints); misses map to `default`."""
+
+    def __init__(self, natural, values, default=UNKNOWN_KEY):
+        natural = np.asarray(natural, dtype=np.int64)
+        values = np.asarray(values)
+        self.default = default
+        self.table = np.full(int(natural.max(initial=0)) + 1, default, dtype=values.dtype)
+        self.table[natural] = values
+
+    def __call__(self, ids):
+        ids = pd.Series(ids).fillna(-1).to_numpy(np.int64)
+        hit = (ids >= 0) & (ids < len(self.table))
+        out = np.full(len(ids), self.default, dtype=self.table.dtype)
+        out[hit] = self.table[ids[hit]]
+        return out
+
+
+def date_keys(dates):
+    """YYYYMMDD int32 keys into dim_date."""
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year * 10000 + dates.month * 100 + dates.day).to_numpy(np.int32)
+
+
+# ============================================
+# Dimensions
+# ============================================
+
+def _with_unknown(dim, key):
+    """Prepend the surrogate-key-0 member that unmatched fact rows point to."""
+    if not len(dim):
+        return dim
+    dim = dim.iloc[np.r_[0, np.arange(len(dim))]].reset_index(drop=True)
+    for col in dim.columns:
+        kind = dim[col].dtype.kind
+        if col == key:
+            dim.loc[0, col] = UNKNOWN_KEY
+        elif kind in "iu":
+            dim.loc[0, col] = -1
+        elif kind in "fM":
+            dim.loc[0, col] = None
+        else:
+            if isinstance(dim[col].dtype, pd.CategoricalDtype) and "Unknown" not in dim[col].cat.categories:
+                dim[col] = dim[col].cat.add_categories("Unknown")
+            dim.loc[0, col] = "Unknown"
+    return dim
+
+
+def _previous_keys(out_dir, name, natural, surrogate):
+    path = Path(out_dir) / "dims" / f"{name}.parquet"
+    if not path.exists():
+        return None
+    prev = pd.read_parquet(path, columns=[natural, surrogate])
+    prev = prev[prev[surrogate] != UNKNOWN_KEY]
+    return prev[natural].to_numpy(), prev[surrogate].to_numpy()
+
+
+def _keyed_dimension(frame, natural, surrogate, name, out_dir):
+    """Attach stable surrogate keys to one row per natural key."""
+    frame = frame.drop_duplicates(natural, keep="last")
+    nk, sk = assign_surrogate_keys(frame[natural], _previous_keys(out_dir, name, natural, surrogate))
+    rows = pd.Series(np.arange(len(frame)), index=frame[natural].to_numpy(np.int64))
+    dim = frame.iloc[rows.reindex(nk).fillna(-1).astype(int).clip(lower=0).to_numpy()].reset_index(drop=True)
+    missing = ~np.isin(nk, frame[natural].to_numpy(np.int64))
+    if missing.any():
+        # members that left the source keep their key but lose their attributes
+        dim.loc[missing, [c for c in dim.columns if c != natural]] = None
+    dim[natural] = nk.astype(frame[natural].dtype)
+    dim.insert(0, surrogate, sk)
+    return _with_unknown(dim, surrogate)
+
+
+def build_dim_date(start, end):
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    return pd.DataFrame({
+        "date_key": date_keys(days),
+        "date": days,
+        "year": days.year.astype(np.int16),
+        "quarter": days.quarter.astype(np.int8),
+        "month": days.month.astype(np.int8),
+        "month_name": days.month_name(),
+        "day": days.day.astype(np.int8),
+        "day_of_week": (days.dayofweek + 1).astype(np.int8),
+        "day_name": days.day_name(),
+        "iso_week": days.isocalendar().week.to_numpy(np.int8),
+        "is_weekend": (days.dayofweek >= 5).astype(np.int8),
+    })
+
+
+def build_dim_customer(customers, crm_customers, out_dir):
+    crm_row = KeyLookup(crm_customers["customer_id"], np.arange(len(crm_customers)), default=-1)
+    rows = crm_row(customers["customer_id"])
+    matched = rows >= 0
+    dim = customers[["customer_id", "full_name", "email", "signup_date", "country", "city",
+                     "gender", "age_group", "segment"]].rename(columns={"segment": "ecommerce_segment"})
+    for src, col in (("segment", "crm_segment"), ("lifecycle_stage", "lifecycle_stage"),
+                     ("clv_estimate", "clv_estimate")):
+        values = crm_customers[src].iloc[np.maximum(rows, 0)].reset_index(drop=True)
+        dim[col] = values.where(matched).array
+    return _keyed_dimension(dim, "customer_id", "customer_sk", "dim_customer", out_dir)
+
+
+def build_dim_product(products, out_dir):
+    dim = products[["product_id", "sku", "product_name", "category", "subcategory", "brand",
+                    "list_price", "base_cost"]]
+    return _keyed_dimension(dim, "product_id", "product_sk", "dim_product", out_dir)
+
+
+def build_dim_campaign(campaigns, out_dir):
+    dim = campaigns[["campaign_id", "campaign_name", "objective", "platform", "start_date",
+                     "end_date", "budget"]]
+    return _keyed_dimension(dim, "campaign_id", "campaign_sk", "dim_campaign", out_dir)
+
+
+def _sk_lookup(dim, natural, surrogate):
+    members = dim[dim[surrogate] != UNKNOWN_KEY]
+    return KeyLookup(members[natural], members[surrogate])
+
+
+# ============================================
+# Facts
+# ============================================
+
+def build_fact_sales(order_items, orders, customer_sk, product_sk):
+    """One row per order line; order attributes are fetched by a dense order_id -> row array."""
+    order_row = KeyLookup(orders["order_id"], np.arange(len(orders)), default=-1)(order_items["order_id"])
+    found = order_row >= 0
+    items, order_row = order_items[found], order_row[found]
+    order_date = orders["order_date"].to_numpy()[order_row]
+    return pd.DataFrame({
+        "order_item_id": items["order_item_id"].to_numpy(),
+        "order_id": items["order_id"].to_numpy(),
+        "order_date": order_date,
+        "date_key": date_keys(order_date),
+        "customer_sk": customer_sk(orders["customer_id"].to_numpy()[order_row]),
+        "product_sk": product_sk(items["product_id"]),
+        "status": orders["status"].to_numpy()[order_row],
+        "sales_channel": orders["sales_channel"].to_numpy()[order_row],
+        "quantity": items["quantity"].to_numpy(),
+        "unit_price": items["unit_price"].to_numpy(),
+        "unit_cost": items["unit_cost"].to_numpy(),
+        "line_revenue": items["line_revenue"].to_numpy(),
+        "line_cost": items["line_cost"].to_numpy(),
+        "line_margin": items["line_margin"].to_numpy(),
+    })
+
+
+def build_fact_ad_performance(daily_performance, ads, ad_groups, campaign_sk):
+    ad_group = KeyLookup(ads["ad_id"], ads["ad_group_id"].to_numpy(np.int64), default=-1)(
+        daily_performance["ad_id"]
+    )
+    campaign = KeyLookup(ad_groups["ad_group_id"], ad_groups["campaign_id"].to_numpy(np.int64), default=-1)(
+        ad_group
+    )
+    return pd.DataFrame({
+        "date": daily_performance["date"].to_numpy(),
+        "date_key": date_keys(daily_performance["date"]),
+        "campaign_sk": campaign_sk(campaign),
+        "ad_group_id": ad_group.astype(np.int32),
+        "ad_id": daily_performance["ad_id"].to_numpy(),
+        "impressions": daily_performance["impressions"].to_numpy(),
+        "clicks": daily_performance["clicks"].to_numpy(),
+        "spend": daily_performance["spend"].to_numpy(),
+    })
+
+
+def build_fact_gl(gl_transactions, chart_of_accounts):
+    categories = pd.Categorical(chart_of_accounts["category"].astype(str))
+    account_category = KeyLookup(chart_of_accounts["account_id"], categories.codes, default=-1)(
+        gl_transactions["account_id"]
+    )
+    return pd.DataFrame({
+        "gl_id": gl_transactions["gl_id"].to_numpy(),
+        "transaction_date": gl_transactions["transaction_date"].to_numpy(),
+        "date_key": date_keys(gl_transactions["transaction_date"]),
+        "account_id": gl_transactions["account_id"].to_numpy(),
+        "account_category": pd.Categorical.from_codes(account_category, categories.categories),
+        "amount": gl_transactions["amount"].to_numpy(),
+    })
+
+
+def build_fact_sessions(sessions, events, conversions, orders, customer_sk):
+    """One row per session; event/conversion counts via bincount on session_id.
+
+    Sessions are anonymous (user_id is a web visitor) unless they converted,
+    in which case the order's customer becomes the session's customer.
+    """
+    session_ids = sessions["session_id"].to_numpy(np.int64)
+    size = int(max(session_ids.max(initial=0), events["session_id"].max() if len(events) else 0,
+                   conversions["session_id"].max() if len(conversions) else 0)) + 1
+    event_counts = np.bincount(events["session_id"].to_numpy(np.int64), minlength=size)
+    conversion_counts = np.bincount(conversions["session_id"].to_numpy(np.int64), minlength=size)
+    revenue = np.bincount(conversions["session_id"].to_numpy(np.int64),
+                          weights=conversions["revenue"].to_numpy(np.float64), minlength=size)
+
+    order_customer = KeyLookup(orders["order_id"], orders["customer_id"].to_numpy(np.int64), default=-1)
+    session_customer = KeyLookup(conversions["session_id"], order_customer(conversions["order_id"]), default=-1)
+
+    return pd.DataFrame({
+        "session_id": sessions["session_id"].to_numpy(),
+        "visit_date": sessions["visit_date"].to_numpy(),
+        "date_key": date_keys(sessions["visit_date"]),
+        "user_id": sessions["user_id"].to_numpy(),
+        "customer_sk": customer_sk(session_customer(session_ids)),
+        "device": sessions["device"].to_numpy(),
+        "traffic_source": sessions["traffic_source"].to_numpy(),
+        "landing_page": sessions["landing_page"].to_numpy(),
+        "session_duration": sessions["session_duration"].to_numpy(),
+        "pages_viewed": sessions["pages_viewed"].to_numpy(),
+        "engaged_session": sessions["engaged_session"].to_numpy(),
+        "events": event_counts[session_ids].astype(np.int32),
+        "conversions": conversion_counts[session_ids].astype(np.int16),
+        "revenue": np.round(revenue[session_ids], 2),
+    })
+
+
+# ============================================
+# Incremental partition writer
+# ============================================
+
+def _month_name(month):
+    """year=YYYY/month=MM for a month index (year * 12 + month - 1)."""
+    return f"year={month // 12}/month={month % 12 + 1:02d}"
+
+
+def write_partitions(fact, date_col, fact_dir, full=False, scope=None):
+    """Write year=/month= partitions whose row fingerprint changed.
+
+    Fingerprint = (rows, wrapping sum of per-row 64-bit hashes), computed
+    for all partitions with one hash pass and np.add.reduceat. Partitions
+    no longer produced are removed. With `scope` (a set of partition names)
+    `fact` holds only those months: the others are left as they are.
+    """
+    fact_dir = Path(fact_dir)
+    manifest_path = fact_dir / "_manifest.json"
+    manifest = {} if full or not manifest_path.exists() else json.loads(manifest_path.read_text())
+    kept = {} if scope is None else {name: fp for name, fp in manifest.items() if name not in scope}
+
+    fact = fact.sort_values([date_col], kind="stable").reset_index(drop=True)
+    dates = pd.DatetimeIndex(fact[date_col])
+    month = (dates.year * 12 + dates.month - 1).to_numpy()
+    starts = np.flatnonzero(np.r_[True, month[1:] != month[:-1]]) if len(month) else np.array([], int)
+    ends = np.r_[starts[1:], len(month)]
+    row_hashes = pd.util.hash_pandas_object(fact, index=False).to_numpy()
+    sums = np.add.reduceat(row_hashes, starts) if len(starts) else np.array([], np.uint64)
+
+    report = {"partitions": len(starts), "written": 0, "skipped": 0, "removed": 0, "rows": len(fact)}
+    current = {}
+    for m, s, e, h in zip(month[starts], starts, ends, sums):
+        name = _month_name(m)
+        fingerprint = f"{e - s}:{int(h):016x}"
+        current[name] = fingerprint
+        part_file = fact_dir / name / "part-0.parquet"
+        if manifest.get(name) == fingerprint and part_file.exists():
+            report["skipped"] += 1
+            continue
+        part_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = part_file.with_suffix(".parquet.tmp")
+        fact.iloc[s:e].to_parquet(tmp, index=False)
+        os.replace(tmp, part_file)
+        report["written"] += 1
+
+    for name in set(manifest) - set(current) - set(kept):
+        shutil.rmtree(fact_dir / name, ignore_errors=True)
+        report["removed"] += 1
+
+    fact_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps({**kept, **current}, indent=1, sort_keys=True))
+    return report
+
+
+FACT_DATES = {
+    "fact_sales": "order_date",
+    "fact_ad_performance": "date",
+    "fact_gl": "transaction_date",
+    "fact_sessions": "visit_date",
+}
+
+# fact -> (lake table whose months are the fact's months,
+#          {other lake tables: months read either side of each month},
+#          small tables and dimensions every month looks up)
+FACT_SOURCES = {
+    "fact_sales": (("ecommerce", "orders"), {("ecommerce", "order_items"): 0},
+                   ["dim_customer", "dim_product"]),
+    "fact_ad_performance": (("marketing", "daily_performance"), {},
+                            [("marketing", "ads"), ("marketing", "ad_groups"), "dim_campaign"]),
+    "fact_gl": (("finance", "gl_transactions"), {}, [("finance", "chart_of_accounts")]),
+    # events, conversions and their orders can fall in the month before or after the visit
+    "fact_sessions": (("web", "sessions"),
+                      {("web", "events"): 1, ("web", "web_conversions"): 1, ("ecommerce", "orders"): 1},
+                      ["dim_customer"]),
+}
+
+ORDER_COLUMNS = ["order_id", "customer_id", "order_date", "status", "sales_channel"]
+
+
+def build_fact(name, read, sk):
+    """Rows of fact `name` from `read(domain, table, columns)` and the surrogate-key lookups."""
+    if name == "fact_sales":
+        return build_fact_sales(read("ecommerce", "order_items"), read("ecommerce", "orders", ORDER_COLUMNS),
+                                sk["dim_customer"], sk["dim_product"])
+    if name == "fact_ad_performance":
+        return build_fact_ad_performance(
+            read("marketing", "daily_performance", ["ad_id", "date", "impressions", "clicks", "spend"]),
+            read("marketing", "ads", ["ad_id", "ad_group_id"]),
+            read("marketing", "ad_groups", ["ad_group_id", "campaign_id"]),
+            sk["dim_campaign"],
+        )
+    if name == "fact_gl":
+        return build_fact_gl(read("finance", "gl_transactions"), read("finance", "chart_of_accounts"))
+    return build_fact_sessions(
+        read("web", "sessions"),
+        read("web", "events", ["session_id"]),
+        read("web", "web_conversions", ["session_id", "order_id", "revenue"]),
+        read("ecommerce", "orders", ORDER_COLUMNS),
+        sk["dim_customer"],
+    )
+
+
+def _frame_hash(frame):
+    return f"{len(frame)}:{int(pd.util.hash_pandas_object(frame, index=False).to_numpy().sum()):016x}"
+
+
+class LakeMonths:
+    """Month partitions of the lake tables the facts are built from.
+
+    Partition fingerprints are file ETags, memoized by (size, mtime, inode)
+    in the warehouse so an unchanged lake is only stat'ed.
+    """
+
+    def __init__(self, lake_dir, memo_path):
+        self.reader = LakeReader(lake_dir)
+        self.memo_path = Path(memo_path)
+        self.etags = json.loads(self.memo_path.read_text()) if self.memo_path.exists() else {}
+        self._files = {}
+
+    def files(self, domain, table):
+        """{month index: partition file} of a lake table ({} when it is not in the lake)."""
+        if (domain, table) not in self._files:
+            parts = self.reader.list_partitions([domain], table=table)
+            self._files[(domain, table)] = {
+                int(year) * 12 + int(month) - 1: path
+                for year, month, path in zip(parts["year"], parts["month"], parts["path"])
+            }
+        return self._files[(domain, table)]
+
+    def etag(self, domain, table, month):
+        path = self.files(domain, table).get(month)
+        if path is None:
+            return None
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        cached = self.etags.get(str(path))
+        if cached is None or cached[0] != stamp:
+            cached = self.etags[str(path)] = [stamp, compute_etag(path)]
+        return cached[1]
+
+    def read(self, domain, table, months, columns=None):
+        files = self.files(domain, table)
+        paths = [files[m] for m in sorted(months) if m in files]
+        if not paths:
+            empty = pq.read_schema(next(iter(files.values()))).empty_table().to_pandas()
+            return empty if columns is None else empty[columns]
+        return pa.concat_tables(pq.read_table(p, columns=columns) for p in paths).to_pandas()
+
+    def save(self):
+        self.memo_path.write_text(json.dumps(self.etags))
+
+
+def _plan_fact(name, lake, static):
+    """{partition name: fingerprint of its inputs} for a fact, or None when its tables are not in the lake."""
+    driver, windows, _ = FACT_SOURCES[name]
+    if not lake.files(*driver) or not all(lake.files(*table) for table in windows):
+        return None
+    inputs = {}
+    for month in lake.files(*driver):
+        parts = [static, lake.etag(*driver, month)]
+        for table, width in sorted(windows.items()):
+            parts += [lake.etag(*table, m) for m in range(month - width, month + width + 1)]
+        inputs[_month_name(month)] = hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+    return inputs
+
+
+def build_star_schema(source=None, out_dir=WAREHOUSE_DIR, full=False, lake_dir=LAKE_DIR):
+    """Build dims and date-partitioned facts; returns {table: report}.
+
+    `source` is a TableSource (default: data/raw) for the dimensions and
+    small lookup tables. Facts are read month by month from the lake under
+    `lake_dir` and only months whose inputs changed are rebuilt; a fact
+    whose tables are not in the lake is built from `source` in one go, so
+    the build can also run on the in-memory output of `src.etl.generate`.
+    """
+    source = TableSource(RAW_DIR) if source is None else source
+    out_dir = Path(out_dir)
+    if full:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    # ---- dimensions (small: rebuilt every time, keys stable)
+    dims = {
+        "dim_customer": build_dim_customer(source("ecommerce", "customers"),
+                                           source("crm", "crm_customers"), out_dir),
+        "dim_product": build_dim_product(source("ecommerce", "products"), out_dir),
+        "dim_campaign": build_dim_campaign(source("marketing", "campaigns"), out_dir),
+    }
+    sk = {
+        "dim_customer": _sk_lookup(dims["dim_customer"], "customer_id", "customer_sk"),
+        "dim_product": _sk_lookup(dims["dim_product"], "product_id", "product_sk"),
+        "dim_campaign": _sk_lookup(dims["dim_campaign"], "campaign_id", "campaign_sk"),
+    }
+    small = {}
+
+    def fingerprint(dep):
+        if isinstance(dep, str):
+            return _frame_hash(dims[dep].iloc[:, :2])
+        if dep not in small:
+            small[dep] = source(*dep)
+        return _frame_hash(small[dep])
+
+    # ---- facts
+    out_dir.mkdir(parents=True, exist_ok=True)
+    lake = LakeMonths(lake_dir, out_dir / "_lake_etags.json")
+    report, years = {}, []
+    for name, (driver, windows, lookups) in FACT_SOURCES.items():
+        fact_dir = out_dir / "facts" / name
+        static = [fingerprint(dep) for dep in lookups]
+        inputs = _plan_fact(name, lake, static)
+
+        if inputs is None:
+            fact = build_fact(name, lambda d, t, columns=None: source(d, t, columns=columns), sk)
+            report[name] = write_partitions(fact, FACT_DATES[name], fact_dir)
+            (fact_dir / "_inputs.json").unlink(missing_ok=True)
+            if len(fact):
+                years += [fact[FACT_DATES[name]].min().year, fact[FACT_DATES[name]].max().year]
+            continue
+
+        inputs_path = fact_dir / "_inputs.json"
+        previous = json.loads(inputs_path.read_text()) if inputs_path.exists() else {}
+        manifest_path = fact_dir / "_manifest.json"
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        stale = {n for n, fp in inputs.items()
+                 if previous.get(n) != fp or (n in manifest and not (fact_dir / n / "part-0.parquet").exists())}
+        scope = stale | (set(previous) - set(inputs))
+        months = {m for m in lake.files(*driver) if _month_name(m) in stale}
+
+        def read(domain, table, columns=None):
+            if (domain, table) == driver:
+                return lake.read(domain, table, months, columns)
+            if (domain, table) in windows:
+                width = windows[(domain, table)]
+                return lake.read(domain, table, {m + d for m in months for d in range(-width, width + 1)},
+                                 columns)
+            return small[(domain, table)] if columns is None else small[(domain, table)][columns]
+
+        report[name] = {"partitions": len(inputs), "months_read": len(months), "written": 0,
+                        "skipped": len(inputs), "removed": 0, "rows": 0}
+        if scope:
+            fact = build_fact(name, read, sk)
+            # side tables read with slack bring rows of neighbouring months along
+            dates = pd.DatetimeIndex(fact[FACT_DATES[name]])
+            fact = fact[np.isin(dates.year * 12 + dates.month - 1, list(months))]
+            written = write_partitions(fact, FACT_DATES[name], fact_dir, scope=scope)
+            report[name].update(written=written["written"], removed=written["removed"], rows=written["rows"],
+                                skipped=len(inputs) - written["written"])
+        fact_dir.mkdir(parents=True, exist_ok=True)
+        inputs_path.write_text(json.dumps(inputs, indent=1, sort_keys=True))
+        years += [m // 12 for m in (min(lake.files(*driver)), max(lake.files(*driver)))]
+    lake.save()
+
+    dims["dim_date"] = build_dim_date(f"{min(years)}-01-01", f"{max(years)}-12-31")
+    (out_dir / "dims").mkdir(parents=True, exist_ok=True)
+    for name, dim in dims.items():
+        dim.to_parquet(out_dir / "dims" / f"{name}.parquet", index=False)
+    return {**{name: {"rows": len(dim)} for name, dim in dims.items()}, **report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the star schema under data/processed/warehouse.")
+    parser.add_argument("--full", action="store_true", help="drop the warehouse and rebuild everything")
+    parser.add_argument("--lake", default=str(LAKE_DIR), help="month-partitioned lake the facts are read from")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    report = build_star_schema(full=args.full, lake_dir=args.lake)
+    for name, stats in report.items():
+        print(f"{name:<20} " + "  ".join(f"{k}={v:,}" for k, v in stats.items()))
+    print(f"built in {time.perf_counter() - t0:.2f}s")
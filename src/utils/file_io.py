@@ -0,0 +1,603 @@
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.schemas import DATETIME, get_schema, list_tables
+from src.utils.validation import SchemaDriftError, check_columns, check_requested_columns
+
+# ============================================
+# Lake locations
+# ============================================
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = PROJECT_ROOT / "data"
+RAW_DIR = DATA_DIR / "raw"
+PROCESSED_DIR = DATA_DIR / "processed"
+
+MB = 1024 * 1024
+
+
+# ============================================
+# 1. Content hashes (S3-compatible ETags)
+# ============================================
+
+def compute_etag(path, part_size=8 * MB, multipart_threshold=8 * MB):
+    """ETag S3 would report for `path` uploaded with the same part size.
+
+    Single-part objects get the plain MD5; multipart objects get the MD5 of
+    the concatenated part digests suffixed with the number of parts.
+    """
+    size = os.path.getsize(path)
+    if size < multipart_threshold:
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(MB), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    part_digests = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(part_size), b""):
+            part_digests.append(hashlib.md5(block).digest())
+    combined = hashlib.md5(b"".join(part_digests)).hexdigest()
+    return f"{combined}-{len(part_digests)}"
+
+
+def iter_lake_files(roots):
+    """Yield (local_path, relative_key) for every data file under `roots`.
+
+    Keys are relative to each root's parent, so data/raw/x.csv is raw/x.csv
+    whichever directory the root lives in.
+    """
+    for root in roots:
+        root = Path(root)
+        if not root.exists():
+            continue
+        for path in sorted(root.rglob("*")):
+            # skip .gitkeep and tool state such as <out>/.build_cache
+            if path.is_file() and not any(part.startswith(".") for part in path.relative_to(root).parts):
+                yield path, path.relative_to(root.parent).as_posix()
+
+
+# ============================================
+# 2. Concurrent uploader
+# ============================================
+
+class LakeUploader:
+    """Sync local lake partitions to an S3-compatible bucket.
+
+    Unchanged objects are skipped by comparing local and remote ETags,
+    large files go up as concurrent multipart uploads over one pooled
+    client, and multipart uploads left behind by an interrupted run are
+    resumed from the parts the server already holds.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, prefix="", max_workers=16,
+                 part_size=8 * MB, multipart_threshold=8 * MB, client=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.multipart_threshold = multipart_threshold
+        self.client = client or self._make_client(endpoint_url, max_workers)
+
+    @staticmethod
+    def _make_client(endpoint_url, max_workers):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as exc:
+            raise ImportError("boto3 is required for S3 uploads: pip install boto3") from exc
+
+        config = Config(
+            max_pool_connections=max_workers,
+            retries={"max_attempts": 5, "mode": "adaptive"},
+        )
+        return boto3.client("s3", endpoint_url=endpoint_url, config=config)
+
+    def _key(self, relative_key):
+        return f"{self.prefix}/{relative_key}" if self.prefix else relative_key
+
+    # ---- remote state
+
+    def _remote_etags(self):
+        etags = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                etags[obj["Key"]] = obj["ETag"].strip('"')
+        return etags
+
+    def _pending_uploads(self):
+        pending = {}
+        paginator = self.client.get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for upload in page.get("Uploads", []):
+                # keep the most recent upload per key; older ones are aborted
+                previous = pending.get(upload["Key"])
+                if previous is not None:
+                    self.client.abort_multipart_upload(
+                        Bucket=self.bucket, Key=previous["Key"], UploadId=previous["UploadId"]
+                    )
+                pending[upload["Key"]] = upload
+        return pending
+
+    # ---- planning
+
+    def plan(self, roots=(RAW_DIR, PROCESSED_DIR)):
+        """Return (to_upload, skipped) lists of (path, key, size, etag)."""
+        remote = self._remote_etags()
+        files = list(iter_lake_files(roots))
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            etags = list(pool.map(
+                lambda item: compute_etag(item[0], self.part_size, self.multipart_threshold),
+                files,
+            ))
+
+        to_upload, skipped = [], []
+        for (path, relative_key), etag in zip(files, etags):
+            key = self._key(relative_key)
+            entry = (path, key, path.stat().st_size, etag)
+            if remote.get(key) == etag:
+                skipped.append(entry)
+            else:
+                to_upload.append(entry)
+        return to_upload, skipped
+
+    # ---- transfers
+
+    def _read_part(self, path, part_number):
+        with open(path, "rb") as f:
+            f.seek((part_number - 1) * self.part_size)
+            return f.read(self.part_size)
+
+    def _put_object(self, path, key):
+        with open(path, "rb") as f:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=f.read())
+
+    def _start_multipart(self, path, key, size, pending):
+        """Create (or resume) a multipart upload and list the parts still missing."""
+        num_parts = max(1, -(-size // self.part_size))
+        done = {}
+
+        upload = pending.get(key)
+        if upload is not None:
+            upload_id = upload["UploadId"]
+            paginator = self.client.get_paginator("list_parts")
+            for page in paginator.paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+                for part in page.get("Parts", []):
+                    done[part["PartNumber"]] = part["ETag"].strip('"')
+            # a part only counts as done if it still matches the local bytes
+            for number, etag in list(done.items()):
+                if number > num_parts or hashlib.md5(self._read_part(path, number)).hexdigest() != etag:
+                    del done[number]
+        else:
+            upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+
+        missing = [n for n in range(1, num_parts + 1) if n not in done]
+        return upload_id, done, missing
+
+    def _upload_part(self, path, key, upload_id, part_number):
+        body = self._read_part(path, part_number)
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            PartNumber=part_number, Body=body,
+        )
+        return part_number, response["ETag"].strip('"')
+
+    def _complete_multipart(self, key, upload_id, parts):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": n, "ETag": f'"{parts[n]}"'} for n in sorted(parts)
+            ]},
+        )
+
+    def sync(self, roots=(RAW_DIR, PROCESSED_DIR)):
+        """Upload new/changed lake files and return throughput stats."""
+        start = time.perf_counter()
+        to_upload, skipped = self.plan(roots)
+
+        small = [e for e in to_upload if e[2] < self.multipart_threshold]
+        large = [e for e in to_upload if e[2] >= self.multipart_threshold]
+        pending = self._pending_uploads() if large else {}
+        resumed_parts = 0
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            # small objects and multipart setup run side by side
+            small_jobs = [pool.submit(self._put_object, path, key) for path, key, _, _ in small]
+            setup_jobs = {
+                key: pool.submit(self._start_multipart, path, key, size, pending)
+                for path, key, size, _ in large
+            }
+
+            uploads = {}
+            part_jobs = []
+            for path, key, _, _ in large:
+                upload_id, done, missing = setup_jobs[key].result()
+                uploads[key] = (upload_id, done)
+                resumed_parts += len(done)
+                part_jobs.extend(
+                    (key, pool.submit(self._upload_part, path, key, upload_id, n))
+                    for n in missing
+                )
+
+            for key, job in part_jobs:
+                number, etag = job.result()
+                uploads[key][1][number] = etag
+
+            complete_jobs = [
+                pool.submit(self._complete_multipart, key, upload_id, parts)
+                for key, (upload_id, parts) in uploads.items()
+            ]
+            for job in small_jobs + complete_jobs:
+                job.result()
+
+        elapsed = time.perf_counter() - start
+        uploaded_bytes = sum(e[2] for e in to_upload)
+        return {
+            "uploaded": len(to_upload),
+            "skipped": len(skipped),
+            "resumed_parts": resumed_parts,
+            "bytes": uploaded_bytes,
+            "seconds": round(elapsed, 3),
+            "objects_per_sec": round(len(to_upload) / elapsed, 1) if elapsed else 0.0,
+            "mb_per_sec": round(uploaded_bytes / MB / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+# ============================================
+# 3. Offline benchmark against a local S3 stand-in
+# ============================================
+
+def benchmark_upload(roots=(RAW_DIR, PROCESSED_DIR), bucket="data-lake-bench", port=5055, **kwargs):
+    """Run a cold and a warm sync against a local moto server and print throughput."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError as exc:
+        raise ImportError("moto[server] is required for the benchmark: pip install 'moto[server]'") from exc
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    try:
+        uploader = LakeUploader(bucket, endpoint_url=f"http://127.0.0.1:{port}", **kwargs)
+        uploader.client.create_bucket(Bucket=bucket)
+
+        results = {"cold": uploader.sync(roots), "warm": uploader.sync(roots)}
+        for run, stats in results.items():
+            print(f"[{run}] uploaded={stats['uploaded']} skipped={stats['skipped']} "
+                  f"{stats['objects_per_sec']} obj/s {stats['mb_per_sec']} MB/s "
+                  f"in {stats['seconds']}s")
+        return results
+    finally:
+        server.stop()
+
+
+# ============================================
+# 4. Typed table loader (schema registry)
+# ============================================
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def table_files(domain, table, raw_dir=RAW_DIR):
+    """Files holding `domain.table`: one CSV (optionally compressed) or a dir of parts."""
+    base = Path(raw_dir) / domain
+    for suffix in COMPRESSION_SUFFIXES.values():
+        single = base / f"{table}.csv{suffix}"
+        if single.exists():
+            return [single]
+    parts = sorted((base / table).glob("part-*.csv*"))
+    if parts:
+        return parts
+    raise FileNotFoundError(f"No data for {domain}.{table} under {base}")
+
+
+def _read_plan(domain, table, columns, raw_dir):
+    """Validate header/columns and build the read_csv arguments for a table."""
+    name = f"{domain}.{table}"
+    schema = get_schema(domain, table)
+    paths = table_files(domain, table, raw_dir)
+
+    header = pd.read_csv(paths[0], nrows=0).columns
+    check_columns(name, schema, header)
+
+    if columns is None:
+        columns = list(schema)
+    else:
+        check_requested_columns(name, schema, columns)
+
+    dtypes = {c: schema[c] for c in columns if schema[c] != DATETIME}
+    dates = [c for c in columns if schema[c] == DATETIME]
+    return name, paths, list(columns), dtypes, dates
+
+
+def _check_dates(name, df, dates):
+    for col in dates:
+        if df[col].notna().any() and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            raise SchemaDriftError(f"{name}: column {col} is not parseable as datetime")
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def read_table(domain, table, columns=None, raw_dir=RAW_DIR):
+    """Load data/raw/<domain>/<table>.csv with its registered dtypes.
+
+    Only `columns` are parsed, dates are parsed by the CSV reader itself and
+    any mismatch between the file and the registry raises SchemaDriftError
+    instead of silently producing object columns. Compressed and chunked
+    outputs of save_tables are read transparently.
+    """
+    name, paths, columns, dtypes, dates = _read_plan(domain, table, columns, raw_dir)
+    try:
+        frames = [
+            pd.read_csv(path, usecols=columns, dtype=dtypes, parse_dates=dates, date_format="ISO8601")
+            for path in paths
+        ]
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    except (ValueError, TypeError) as exc:
+        raise SchemaDriftError(f"{name}: values do not match registered types ({exc})") from exc
+    return _check_dates(name, df, dates)[columns]
+
+
+def iter_table(domain, table, columns=None, chunk_rows=1_000_000, raw_dir=RAW_DIR, parts=None):
+    """read_table in chunks of at most `chunk_rows` rows (bounded memory).
+
+    `parts` restricts the read to those indices of table_files(), so the
+    parts of a chunked table can be streamed by separate workers. Category
+    columns are categorical per chunk (categories seen in that chunk).
+    """
+    name, paths, columns, dtypes, dates = _read_plan(domain, table, columns, raw_dir)
+    if parts is not None:
+        paths = [paths[i] for i in parts]
+    for path in paths:
+        try:
+            with pd.read_csv(path, usecols=columns, dtype=dtypes, parse_dates=dates,
+                             date_format="ISO8601", chunksize=chunk_rows) as reader:
+                for chunk in reader:
+                    yield _check_dates(name, chunk, dates)[columns]
+        except (ValueError, TypeError) as exc:
+            raise SchemaDriftError(f"{name}: values do not match registered types ({exc})") from exc
+
+
+def conform_table(frame, domain, table, columns=None):
+    """Give an in-memory frame the columns and dtypes read_table would return.
+
+    Labels are rebuilt from their string values so categories come out
+    sorted and limited to observed values, exactly as after a CSV round trip.
+    """
+    name = f"{domain}.{table}"
+    schema = get_schema(domain, table)
+    check_columns(name, schema, frame.columns)
+    if columns is None:
+        columns = list(schema)
+    else:
+        check_requested_columns(name, schema, columns)
+
+    out = {}
+    for col in columns:
+        dtype, values = schema[col], frame[col]
+        if dtype == DATETIME:
+            out[col] = pd.to_datetime(values)
+        elif dtype in ("category", "string"):
+            labels = values.astype(object)
+            out[col] = labels.where(labels.isna(), labels.map(str, na_action="ignore")).astype(dtype)
+        else:
+            out[col] = values.astype(dtype)
+    return pd.DataFrame(out).reset_index(drop=True)
+
+
+class TableSource:
+    """Upstream tables for the generators: this run's frames first, then disk.
+
+    Generating several domains in one process registers each domain's
+    output with `add`, so downstream domains read it from memory instead of
+    round-tripping through CSV; anything not generated in this run falls
+    back to read_table under `raw_dir`.
+    """
+
+    def __init__(self, raw_dir=RAW_DIR):
+        self.raw_dir = Path(raw_dir)
+        self.tables = {}
+
+    def add(self, domain, tables):
+        for table, frame in tables.items():
+            self.tables[(domain, table)] = frame
+
+    def __call__(self, domain, table, columns=None):
+        frame = self.tables.get((domain, table))
+        if frame is None:
+            return read_table(domain, table, columns=columns, raw_dir=self.raw_dir)
+        return conform_table(frame, domain, table, columns)
+
+
+def benchmark_reads(raw_dir=RAW_DIR):
+    """Compare the generators' bare pd.read_csv + pd.to_datetime with read_table."""
+    rows = []
+    for domain, table in list_tables():
+        try:
+            paths = table_files(domain, table, raw_dir)
+        except FileNotFoundError:
+            continue
+        schema = get_schema(domain, table)
+        t0 = time.perf_counter()
+        bare = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+        for col in (c for c, t in schema.items() if t == DATETIME):
+            bare[col] = pd.to_datetime(bare[col])
+        bare_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        typed = read_table(domain, table, raw_dir=raw_dir)
+        typed_s = time.perf_counter() - t0
+        rows.append({
+            "table": f"{domain}.{table}",
+            "rows": len(typed),
+            "bare_ms": round(bare_s * 1000, 1),
+            "typed_ms": round(typed_s * 1000, 1),
+            "bare_mb": round(bare.memory_usage(deep=True).sum() / MB, 2),
+            "typed_mb": round(typed.memory_usage(deep=True).sum() / MB, 2),
+        })
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+    print(f"total memory: {report['bare_mb'].sum():.2f} MB -> {report['typed_mb'].sum():.2f} MB")
+    return report
+
+
+# ============================================
+# 5. Concurrent, compressed save stage
+# ============================================
+
+def _open_compressed(path, compression):
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError("zstandard is required for zstd output: pip install zstandard") from exc
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+    raise ValueError(f"Unknown compression {compression!r}; use one of {list(COMPRESSION_SUFFIXES)}")
+
+
+def _write_chunk(frame, path, compression, block_rows=100_000):
+    """Stream `frame` as CSV into `path`.tmp, then rename it into place.
+
+    Returns (uncompressed bytes, bytes on disk, start, end) with
+    perf_counter start/end times.
+    """
+    t0 = time.perf_counter()
+    tmp = path.with_name(path.name + ".tmp")
+    raw_bytes = 0
+    with _open_compressed(tmp, compression) as out:
+        for start in range(0, max(len(frame), 1), block_rows):
+            block = frame.iloc[start:start + block_rows]
+            data = block.to_csv(index=False, header=start == 0).encode("utf-8")
+            out.write(data)
+            raw_bytes += len(data)
+    os.replace(tmp, path)
+    return raw_bytes, path.stat().st_size, t0, time.perf_counter()
+
+
+def save_tables(out_dir, tables, compression=None, chunk_rows=None, max_workers=None,
+                executor="thread"):
+    """Write a domain's tables concurrently and return a per-table report.
+
+    Each table is split into chunks of `chunk_rows` (one file when None)
+    and every chunk is an independent job in one pool. Chunks are written
+    to a temp name and renamed when complete; chunked tables are staged in
+    a temp directory that replaces the previous output only once every part
+    has landed, so readers never see a half-written table. Outputs under
+    another suffix are removed only after the new files are in place.
+    write_s is the table's wall-clock time, first chunk start to last
+    chunk end.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".csv" + COMPRESSION_SUFFIXES[compression]
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+
+    start = time.perf_counter()
+    jobs = {}
+    with pool_cls(max_workers) as pool:
+        for name, frame in tables.items():
+            if chunk_rows is None or len(frame) <= chunk_rows:
+                targets = [(frame, out_dir / f"{name}{suffix}")]
+                staging = None
+            else:
+                staging = out_dir / f".{name}.staging"
+                shutil.rmtree(staging, ignore_errors=True)
+                staging.mkdir()
+                targets = [
+                    (frame.iloc[i:i + chunk_rows], staging / f"part-{i // chunk_rows:05d}{suffix}")
+                    for i in range(0, len(frame), chunk_rows)
+                ]
+            futures = [pool.submit(_write_chunk, part, path, compression) for part, path in targets]
+            jobs[name] = (len(frame), staging, futures)
+
+        rows = []
+        for name, (num_rows, staging, futures) in jobs.items():
+            results = [f.result() for f in futures]
+            if staging is None:
+                shutil.rmtree(out_dir / name, ignore_errors=True)
+                for stale in out_dir.glob(f"{name}.csv*"):
+                    if stale.name != f"{name}{suffix}":
+                        stale.unlink()
+            else:
+                final = out_dir / name
+                old = out_dir / f".{name}.old"
+                if final.exists():
+                    os.replace(final, old)
+                os.replace(staging, final)
+                shutil.rmtree(old, ignore_errors=True)
+                for stale in out_dir.glob(f"{name}.csv*"):
+                    stale.unlink()
+            raw = sum(r for r, _, _, _ in results)
+            written = sum(w for _, w, _, _ in results)
+            seconds = max(e for _, _, _, e in results) - min(s for _, _, s, _ in results)
+            rows.append({
+                "table": name,
+                "rows": num_rows,
+                "files": len(results),
+                "raw_mb": round(raw / MB, 2),
+                "written_mb": round(written / MB, 2),
+                "ratio": round(raw / written, 2) if written else 0.0,
+                "write_s": round(seconds, 3),
+                "mb_per_sec": round(raw / MB / seconds, 1) if seconds else 0.0,
+            })
+
+    report = pd.DataFrame(rows)
+    total = time.perf_counter() - start
+    print(report.to_string(index=False))
+    print(f"saved {len(tables)} tables to {out_dir} in {total:.2f}s "
+          f"({report['raw_mb'].sum() / total:.1f} MB/s wall)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync data/raw and data/processed to S3.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sync_cmd = sub.add_parser("sync", help="upload new/changed lake files")
+    sync_cmd.add_argument("--bucket", required=True)
+    sync_cmd.add_argument("--endpoint-url", default=None)
+    sync_cmd.add_argument("--prefix", default="")
+    sync_cmd.add_argument("--workers", type=int, default=16)
+    sync_cmd.add_argument("--part-size-mb", type=int, default=8)
+
+    bench_cmd = sub.add_parser("bench", help="benchmark against a local moto server")
+    bench_cmd.add_argument("--workers", type=int, default=16)
+    bench_cmd.add_argument("--part-size-mb", type=int, default=8)
+
+    sub.add_parser("bench-read", help="compare typed loads with bare pd.read_csv")
+
+    args = parser.parse_args()
+
+    if args.command == "bench-read":
+        benchmark_reads()
+    elif args.command == "sync":
+        part_size = args.part_size_mb * MB
+        stats = LakeUploader(
+            args.bucket, endpoint_url=args.endpoint_url, prefix=args.prefix,
+            max_workers=args.workers, part_size=part_size, multipart_threshold=part_size,
+        ).sync()
+        print(stats)
+    else:
+        part_size = args.part_size_mb * MB
+        benchmark_upload(max_workers=args.workers, part_size=part_size, multipart_threshold=part_size)
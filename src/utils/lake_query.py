@@ -0,0 +1,289 @@
+import argparse
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.utils.file_io import PROCESSED_DIR, RAW_DIR, read_table, table_files
+
+# ============================================
+# Partitioning spec: which date column splits each table
+# ============================================
+
+PARTITION_COLUMNS = {
+    ("finance", "orders"): "order_date",
+    ("finance", "invoices"): "invoice_date",
+    ("finance", "payments"): "payment_date",
+    ("finance", "ar_subledger"): "entry_date",
+    ("finance", "expenses"): "expense_date",
+    ("finance", "gl_transactions"): "transaction_date",
+    ("marketing", "daily_performance"): "date",
+    ("marketing", "leads"): "lead_date",
+    ("ecommerce", "orders"): "order_date",
+    ("ecommerce", "order_items"): "order_date",
+    ("ecommerce", "returns"): "return_date",
+    ("crm", "crm_interactions"): "interaction_date",
+    ("crm", "crm_tickets"): "created_at",
+    ("web", "sessions"): "visit_date",
+    ("web", "pageviews"): "timestamp",
+    ("web", "events"): "event_timestamp",
+    ("web", "web_conversions"): "conversion_timestamp",
+}
+
+# tables without a date of their own are partitioned by their parent's:
+# (parent table, join key); the parent's date column is added to the rows
+PARENT_DATES = {
+    ("ecommerce", "order_items"): (("ecommerce", "orders"), "order_id"),
+}
+
+LAKE_DIR = PROCESSED_DIR / "lake"
+ROW_GROUP_SIZE = 128_000
+
+
+# ============================================
+# 1. Raw CSV -> month-partitioned Parquet
+# ============================================
+
+def build_partitions(domain, table, raw_dir=RAW_DIR, lake_dir=LAKE_DIR):
+    """Rewrite the raw table as year=/month= Parquet partitions.
+
+    Rows are sorted by the partition date so row-group min/max statistics are
+    tight and range filters can skip row groups, not just files. Partitions
+    are written to a staging directory that then replaces the table, so
+    months no longer in the raw data disappear and readers never see a
+    half-written table.
+    """
+    date_col = PARTITION_COLUMNS[(domain, table)]
+    df = read_table(domain, table, raw_dir=raw_dir)
+    if (domain, table) in PARENT_DATES:
+        (parent_domain, parent_table), key = PARENT_DATES[(domain, table)]
+        parent = read_table(parent_domain, parent_table, columns=[key, date_col], raw_dir=raw_dir)
+        df[date_col] = df[key].map(pd.Series(parent[date_col].to_numpy(), index=parent[key].to_numpy()))
+    df = df.sort_values(date_col, kind="stable")
+
+    table_dir = Path(lake_dir) / domain / table
+    staging = table_dir.with_name(f".{table}.staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    written = 0
+    for (year, month), part in df.groupby(
+        [df[date_col].dt.year, df[date_col].dt.month], sort=True
+    ):
+        part_dir = staging / f"year={int(year)}" / f"month={int(month):02d}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(
+            pa.Table.from_pandas(part, preserve_index=False),
+            part_dir / "part-0.parquet",
+            row_group_size=ROW_GROUP_SIZE,
+        )
+        written += 1
+
+    retired = table_dir.with_name(f".{table}.old")
+    shutil.rmtree(retired, ignore_errors=True)
+    if table_dir.exists():
+        table_dir.rename(retired)
+    staging.rename(table_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+    return written
+
+
+def build_lake(raw_dir=RAW_DIR, lake_dir=LAKE_DIR):
+    """Partition every raw table that exists on disk."""
+    for (domain, table) in PARTITION_COLUMNS:
+        try:
+            table_files(domain, table, raw_dir)
+        except FileNotFoundError:
+            continue
+        n = build_partitions(domain, table, raw_dir, lake_dir)
+        print(f"{domain}.{table}: {n} partitions")
+
+
+# ============================================
+# 2. Reader with partition pruning + pushdown
+# ============================================
+
+def _month_start(value):
+    ts = pd.Timestamp(value)
+    return ts.year * 12 + ts.month - 1
+
+
+class LakeReader:
+    """Athena-style reads over the partitioned lake.
+
+    Queries prune year/month directories from the date range, skip row
+    groups whose statistics cannot match the filters, read only the
+    projected columns and keep parsed Parquet footers in a small LRU
+    cache so repeated queries do not reopen metadata.
+    """
+
+    def __init__(self, lake_dir=LAKE_DIR, cache_size=256):
+        self.lake_dir = Path(lake_dir)
+        self.cache_size = cache_size
+        self._footers = OrderedDict()
+        self.files_read = 0
+
+    # ---- metadata
+
+    def _footer(self, path):
+        key = (str(path), path.stat().st_mtime_ns)
+        footer = self._footers.get(key)
+        if footer is not None:
+            self._footers.move_to_end(key)
+            return footer
+        footer = pq.read_metadata(path)
+        self._footers[key] = footer
+        if len(self._footers) > self.cache_size:
+            self._footers.popitem(last=False)
+        return footer
+
+    def list_partitions(self, domains=None, start=None, end=None, table="*"):
+        """One row per partition file, pruned by domain, table and date range."""
+        lo = _month_start(start) if start is not None else None
+        hi = _month_start(end) if end is not None else None
+
+        rows = []
+        for path in sorted(self.lake_dir.glob(f"*/{table}/year=*/month=*/*.parquet")):
+            domain, table = path.parts[-5], path.parts[-4]
+            if table.startswith("."):   # staging / retired copies of a table being rebuilt
+                continue
+            if domains is not None and domain not in domains:
+                continue
+            year = int(path.parts[-3].split("=")[1])
+            month = int(path.parts[-2].split("=")[1])
+            index = year * 12 + month - 1
+            if (lo is not None and index < lo) or (hi is not None and index > hi):
+                continue
+            rows.append({
+                "domain": domain, "table": table, "year": year, "month": month,
+                "path": path, "num_rows": self._footer(path).num_rows,
+                "bytes": path.stat().st_size,
+            })
+        return pd.DataFrame(rows, columns=["domain", "table", "year", "month", "path", "num_rows", "bytes"])
+
+    # ---- row-group pruning
+
+    @staticmethod
+    def _row_group_may_match(row_group, column_index, predicates):
+        for name, op, value in predicates:
+            idx = column_index.get(name)
+            if idx is None:
+                continue
+            stats = row_group.column(idx).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            lo, hi = stats.min, stats.max
+            if hasattr(lo, "year"):
+                value = pd.Timestamp(value)
+                lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+            try:
+                if op in ("==", "=") and not (lo <= value <= hi):
+                    return False
+                if op == ">" and hi <= value:
+                    return False
+                if op == ">=" and hi < value:
+                    return False
+                if op == "<" and lo >= value:
+                    return False
+                if op == "<=" and lo > value:
+                    return False
+                if op == "in" and not any(lo <= v <= hi for v in value):
+                    return False
+            except TypeError:
+                continue
+        return True
+
+    # ---- query
+
+    def query(self, domain, table, columns=None, filters=None, start=None, end=None,
+              as_arrow=False):
+        """Read `domain.table` with projection, filters and a date range.
+
+        `filters` is a list of (column, op, value) tuples ANDed together, the
+        same shape pandas/pyarrow accept. `start`/`end` are inclusive bounds on
+        the table's partition date column and prune whole partitions.
+        """
+        date_col = PARTITION_COLUMNS[(domain, table)]
+        predicates = list(filters or [])
+        if start is not None:
+            predicates.append((date_col, ">=", pd.Timestamp(start)))
+        if end is not None:
+            predicates.append((date_col, "<=", pd.Timestamp(end)))
+
+        partitions = self.list_partitions([domain], start, end, table=table)
+
+        read_columns = None
+        if columns is not None:
+            needed = [c for c, _, _ in predicates if c not in columns]
+            read_columns = list(columns) + list(dict.fromkeys(needed))
+
+        expression = pq.filters_to_expression(predicates) if predicates else None
+        pieces = []
+        for path in partitions["path"]:
+            footer = self._footer(path)
+            column_index = {
+                footer.schema.column(i).name: i for i in range(footer.num_columns)
+            }
+            row_groups = [
+                i for i in range(footer.num_row_groups)
+                if self._row_group_may_match(footer.row_group(i), column_index, predicates)
+            ]
+            if not row_groups:
+                continue
+            self.files_read += 1
+            piece = pq.ParquetFile(path, metadata=footer).read_row_groups(
+                row_groups, columns=read_columns
+            )
+            if expression is not None:
+                piece = piece.filter(expression)
+            pieces.append(piece)
+
+        if pieces:
+            result = pa.concat_tables(pieces, promote_options="default")
+        else:
+            any_file = next((self.lake_dir / domain / table).glob("year=*/month=*/*.parquet"), None)
+            schema = pq.read_schema(any_file) if any_file is not None else pa.schema([])
+            result = schema.empty_table()
+        if columns is not None:
+            result = result.select([c for c in columns if c in result.column_names])
+        return result if as_arrow else result.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition the raw lake and query it.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="write month-partitioned Parquet under data/processed/lake")
+    bench_cmd = sub.add_parser("bench", help="time a one-month query against a full CSV read")
+    bench_cmd.add_argument("--domain", default="finance")
+    bench_cmd.add_argument("--table", default="orders")
+    bench_cmd.add_argument("--month", default="2023-02")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_lake()
+    else:
+        date_col = PARTITION_COLUMNS[(args.domain, args.table)]
+        start = pd.Timestamp(args.month)
+        end = start + pd.offsets.MonthEnd(1) + pd.Timedelta(hours=23, minutes=59, seconds=59)
+
+        t0 = time.perf_counter()
+        full = pd.concat(
+            [pd.read_csv(path, parse_dates=[date_col]) for path in table_files(args.domain, args.table)]
+        )
+        full = full[(full[date_col] >= start) & (full[date_col] <= end)]
+        csv_s = time.perf_counter() - t0
+
+        reader = LakeReader()
+        t0 = time.perf_counter()
+        cold = reader.query(args.domain, args.table, start=start, end=end)
+        cold_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        reader.query(args.domain, args.table, start=start, end=end)
+        warm_s = time.perf_counter() - t0
+
+        print(f"rows: csv={len(full)} lake={len(cold)}")
+        print(f"csv full scan: {csv_s * 1000:.1f} ms | lake cold: {cold_s * 1000:.1f} ms "
+              f"| lake warm: {warm_s * 1000:.1f} ms | files read: {reader.files_read}")
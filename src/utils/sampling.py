@@ -0,0 +1,278 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.file_io import DATA_DIR, RAW_DIR, conform_table, iter_table, read_table, save_tables, table_files
+from src.utils.schemas import get_schema, list_tables
+
+# ============================================
+# Root membership
+# ============================================
+#
+# A root entity is in the sample when a splitmix64 hash of (seed, entity,
+# id) falls under `fraction`: the same seed always picks the same ids, and
+# a larger fraction is a superset of a smaller one.
+
+SAMPLE_DIR = DATA_DIR / "sample"
+ROOT_STREAMS = {"customer": 1, "campaign": 2, "session": 3, "expense": 4}
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def unit_hash(ids, seed, stream):
+    """splitmix64(seed, stream, id) mapped to [0, 1); shared with the customer dimension."""
+    salt = np.uint64((((seed << 16) + stream) * int(_MIX_1)) & 0xFFFFFFFFFFFFFFFF)
+    with np.errstate(over="ignore"):
+        x = ids.astype(np.uint64) * _GOLDEN + salt
+        x ^= x >> np.uint64(30)
+        x *= _MIX_1
+        x ^= x >> np.uint64(27)
+        x *= _MIX_2
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _ids(values):
+    """Integer ids as int64 with -1 for nulls."""
+    return pd.Series(values).astype("Int64").fillna(-1).to_numpy(np.int64)
+
+
+class Members:
+    """Ids of one entity in the sample.
+
+    Roots test the hash; every entity also holds a dense mask of ids added
+    while walking the foreign keys (children of kept parents, or parents
+    referenced by a kept row of another lineage).
+    """
+
+    def __init__(self, fraction=None, seed=0, stream=0):
+        self.fraction = fraction
+        self.seed = seed
+        self.stream = stream
+        self.mask = np.zeros(0, dtype=bool)
+
+    def add(self, ids):
+        ids = ids[ids >= 0]
+        if len(ids) == 0:
+            return
+        top = int(ids.max()) + 1
+        if top > len(self.mask):
+            grown = np.zeros(max(top, 2 * len(self.mask)), dtype=bool)
+            grown[:len(self.mask)] = self.mask
+            self.mask = grown
+        self.mask[ids] = True
+
+    def __call__(self, ids):
+        known = (ids >= 0) & (ids < len(self.mask))
+        hit = np.zeros(len(ids), dtype=bool)
+        hit[known] = self.mask[ids[known]]
+        if self.fraction is not None:
+            hit |= (ids >= 0) & (unit_hash(ids, self.seed, self.stream) < self.fraction)
+        return hit
+
+
+# ============================================
+# Propagation plan
+# ============================================
+#
+# Tables are visited once, in this order, so every parent is decided before
+# its children. Each rule is (domain, table, keep, add):
+#   keep  None keeps the whole table (small dimensions and aggregates),
+#         (entity, column) keeps rows whose column is a member of entity,
+#         a list of those keeps rows matching any of them;
+#   add   (entity, column) pairs whose values of kept rows join the sample.
+# Marketing and web go first: a kept lead or conversion adds the order it
+# references, and every kept order adds its customer as `customer_ref`, so
+# those parent rows are kept later on even when the customer was not drawn.
+# Referenced customers bring their own CRM rows but not their other orders,
+# which keeps the sample small and still join-complete. CDC logs follow
+# their snapshot table on its primary key, the only column a delete event
+# carries, so a sampled log compacts to exactly the sampled snapshot.
+
+CUSTOMER = [("customer", "customer_id"), ("customer_ref", "customer_id")]
+
+PLAN = [
+    ("marketing", "campaigns", ("campaign", "campaign_id"), []),
+    ("marketing", "ad_groups", ("campaign", "campaign_id"), [("ad_group", "ad_group_id")]),
+    ("marketing", "ads", ("ad_group", "ad_group_id"), [("ad", "ad_id")]),
+    ("marketing", "daily_performance", ("ad", "ad_id"), []),
+    ("marketing", "leads", ("ad", "ad_id"), [("customer_ref", "customer_id"), ("order", "order_id")]),
+    ("web", "sessions", ("session", "session_id"), []),
+    ("web", "pageviews", ("session", "session_id"), []),
+    ("web", "events", ("session", "session_id"), []),
+    ("web", "web_conversions", ("session", "session_id"), [("order", "order_id")]),
+    ("finance", "chart_of_accounts", None, []),
+    ("finance", "vendors", None, []),
+    ("finance", "orders", [("customer", "customer_id"), ("order", "order_id")],
+     [("order", "order_id"), ("customer_ref", "customer_id")]),
+    ("finance", "invoices", ("order", "order_id"), [("invoice", "invoice_id")]),
+    ("finance", "payments", ("invoice", "invoice_id"), [("payment", "payment_id")]),
+    ("finance", "ar_subledger", ("invoice", "invoice_id"), []),
+    ("finance", "invoices_cdc", ("invoice", "invoice_id"), []),
+    ("finance", "expenses", ("expense", "expense_id"), []),
+    ("finance", "gl_transactions", "source", []),
+    ("ecommerce", "products", None, []),
+    ("ecommerce", "product_prices", None, []),
+    ("ecommerce", "customers", CUSTOMER, []),
+    ("ecommerce", "orders", ("order", "order_id"), []),
+    ("ecommerce", "order_items", ("order", "order_id"), []),
+    ("ecommerce", "returns", ("order", "order_id"), []),
+    ("crm", "crm_customers", CUSTOMER, []),
+    ("crm", "crm_interactions", CUSTOMER, []),
+    ("crm", "crm_tickets", CUSTOMER, [("ticket", "ticket_id")]),
+    ("crm", "crm_churn_flags", CUSTOMER, []),
+    ("crm", "crm_cohort_retention", None, []),
+    ("crm", "crm_customers_cdc", CUSTOMER, []),
+    ("crm", "crm_tickets_cdc", ("ticket", "ticket_id"), []),
+]
+
+# GL postings follow the document that caused them
+GL_SOURCES = {"invoice": "invoice", "write_off": "invoice", "payment": "payment", "expense": "expense"}
+
+# (table, column, parent table, parent column) checked by check_sample
+FOREIGN_KEYS = [
+    ("marketing.ad_groups", "campaign_id", "marketing.campaigns", "campaign_id"),
+    ("marketing.ads", "ad_group_id", "marketing.ad_groups", "ad_group_id"),
+    ("marketing.daily_performance", "ad_id", "marketing.ads", "ad_id"),
+    ("marketing.leads", "ad_id", "marketing.ads", "ad_id"),
+    ("marketing.leads", "customer_id", "ecommerce.customers", "customer_id"),
+    ("marketing.leads", "order_id", "finance.orders", "order_id"),
+    ("web.pageviews", "session_id", "web.sessions", "session_id"),
+    ("web.events", "session_id", "web.sessions", "session_id"),
+    ("web.events", "product_id", "ecommerce.products", "product_id"),
+    ("web.web_conversions", "session_id", "web.sessions", "session_id"),
+    ("web.web_conversions", "order_id", "ecommerce.orders", "order_id"),
+    ("finance.orders", "customer_id", "ecommerce.customers", "customer_id"),
+    ("finance.invoices", "order_id", "finance.orders", "order_id"),
+    ("finance.payments", "invoice_id", "finance.invoices", "invoice_id"),
+    ("finance.ar_subledger", "invoice_id", "finance.invoices", "invoice_id"),
+    ("finance.expenses", "vendor_id", "finance.vendors", "vendor_id"),
+    ("finance.gl_transactions", "account_id", "finance.chart_of_accounts", "account_id"),
+    ("ecommerce.product_prices", "product_id", "ecommerce.products", "product_id"),
+    ("ecommerce.orders", "customer_id", "ecommerce.customers", "customer_id"),
+    ("ecommerce.order_items", "order_id", "ecommerce.orders", "order_id"),
+    ("ecommerce.order_items", "product_id", "ecommerce.products", "product_id"),
+    ("ecommerce.returns", "order_item_id", "ecommerce.order_items", "order_item_id"),
+    ("ecommerce.returns", "customer_id", "ecommerce.customers", "customer_id"),
+    ("crm.crm_customers", "customer_id", "ecommerce.customers", "customer_id"),
+    ("crm.crm_interactions", "customer_id", "ecommerce.customers", "customer_id"),
+    ("crm.crm_tickets", "customer_id", "ecommerce.customers", "customer_id"),
+    ("crm.crm_churn_flags", "customer_id", "ecommerce.customers", "customer_id"),
+    ("finance.invoices_cdc", "invoice_id", "finance.invoices", "invoice_id"),
+    ("crm.crm_customers_cdc", "customer_id", "crm.crm_customers", "customer_id"),
+    ("crm.crm_tickets_cdc", "ticket_id", "crm.crm_tickets", "ticket_id"),
+]
+
+
+def _keep_mask(chunk, keep, members):
+    if keep is None:
+        return np.ones(len(chunk), dtype=bool)
+    if keep == "source":
+        mask = np.zeros(len(chunk), dtype=bool)
+        source_ids = _ids(chunk["source_id"])
+        source_type = chunk["source_type"].astype(str).to_numpy()
+        for source, entity in GL_SOURCES.items():
+            rows = source_type == source
+            mask[rows] = members[entity](source_ids[rows])
+        return mask
+    mask = np.zeros(len(chunk), dtype=bool)
+    for entity, column in [keep] if isinstance(keep, tuple) else keep:
+        mask |= members[entity](_ids(chunk[column]))
+    return mask
+
+
+# ============================================
+# Sampling
+# ============================================
+
+def sample_lake(fraction=0.05, seed=42, raw_dir=RAW_DIR, out_dir=SAMPLE_DIR, chunk_rows=1_000_000,
+                compression=None):
+    """Write a join-complete sample of `raw_dir` to `out_dir` in one pass per table.
+
+    Customers, campaigns, sessions and expenses are drawn by hash and every
+    other table follows them through its foreign keys (see PLAN). The sample
+    has the raw layout, so read_table(..., raw_dir=out_dir) reads it.
+    """
+    out_dir = Path(out_dir)
+    members = {entity: Members(fraction, seed, stream) for entity, stream in ROOT_STREAMS.items()}
+    for entity in ("customer_ref", "ad_group", "ad", "order", "invoice", "payment", "ticket"):
+        members[entity] = Members()
+
+    rows, sampled = [], {}
+    planned = {(domain, table) for domain, table, _, _ in PLAN}
+    for domain, table in list_tables():
+        if (domain, table) not in planned:
+            print(f"  {domain}.{table}: no sampling rule, skipped")
+
+    for domain, table, keep, add in PLAN:
+        try:
+            table_files(domain, table, raw_dir)
+        except FileNotFoundError:
+            continue
+        start = time.perf_counter()
+        seen, kept = 0, []
+        for chunk in iter_table(domain, table, chunk_rows=chunk_rows, raw_dir=raw_dir):
+            seen += len(chunk)
+            chunk = chunk[_keep_mask(chunk, keep, members)]
+            for entity, column in add:
+                members[entity].add(_ids(chunk[column]))
+            kept.append(chunk)
+        if kept:
+            frame = pd.concat(kept, ignore_index=True)
+        else:  # no rows on disk: an empty frame with the schema's dtypes
+            frame = conform_table(pd.DataFrame(columns=list(get_schema(domain, table))), domain, table)
+        sampled.setdefault(domain, {})[table] = frame
+        rows.append({
+            "domain": domain, "table": table, "rows": seen, "sampled_rows": len(frame),
+            "seconds": round(time.perf_counter() - start, 2),
+        })
+        print(f"  {domain}.{table}: {seen:,} -> {len(frame):,} rows")
+
+    for domain, tables in sampled.items():
+        save_tables(out_dir / domain, tables, compression=compression)
+    return pd.DataFrame(rows)
+
+
+def check_sample(sample_dir=SAMPLE_DIR):
+    """Count rows of the sample whose foreign key has no parent row (all zero when join-complete)."""
+    parents, rows = {}, []
+    for child, column, parent, parent_column in FOREIGN_KEYS:
+        try:
+            values = read_table(*child.split("."), columns=[column], raw_dir=sample_dir)[column]
+            if (parent, parent_column) not in parents:
+                parents[(parent, parent_column)] = read_table(
+                    *parent.split("."), columns=[parent_column], raw_dir=sample_dir)[parent_column]
+        except FileNotFoundError:
+            continue
+        values = values.dropna()
+        orphans = int((~values.isin(parents[(parent, parent_column)])).sum())
+        rows.append({"child": f"{child}.{column}", "parent": f"{parent}.{parent_column}",
+                     "rows": len(values), "orphans": orphans})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Referentially consistent samples of the raw lake.")
+    sub = parser.add_subparsers(dest="command")
+    run = sub.add_parser("run", help="sample data/raw into data/sample (default command)")
+    run.add_argument("--fraction", type=float, default=0.05, help="share of root entities kept")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out", default=str(SAMPLE_DIR))
+    run.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    check = sub.add_parser("check", help="count orphaned foreign keys in a sample")
+    check.add_argument("--out", default=str(SAMPLE_DIR))
+    args = parser.parse_args()
+
+    out_dir = getattr(args, "out", str(SAMPLE_DIR))
+    if args.command != "check":
+        start = time.perf_counter()
+        report = sample_lake(getattr(args, "fraction", 0.05), getattr(args, "seed", 42),
+                             out_dir=Path(out_dir), compression=getattr(args, "compression", None))
+        print(f"sampled {report['rows'].sum():,} -> {report['sampled_rows'].sum():,} rows "
+              f"in {time.perf_counter() - start:.1f}s")
+    print(check_sample(Path(out_dir)).to_string(index=False))
@@ -0,0 +1,336 @@
+# ============================================
+# Schema registry for every table the generators emit
+# ============================================
+#
+# One entry per data/raw/<domain>/<table>.csv, columns in file order.
+# Types are pandas dtypes picked to keep frames compact:
+#   int32 / int16 / int8  -> ids, counts and flags that are never missing
+#   Int32                 -> nullable ids (left-join results, optional links)
+#   category              -> low-cardinality labels
+#   string                -> free text / high-cardinality labels
+#   datetime              -> parsed natively by the reader (parse_dates)
+
+DATETIME = "datetime"
+
+SCHEMAS = {
+    "finance": {
+        "chart_of_accounts": {
+            "account_id": "int32",
+            "account_name": "string",
+            "category": "category",
+        },
+        "vendors": {
+            "vendor_id": "int32",
+            "vendor_name": "string",
+            "category": "category",
+            "payment_terms": "category",
+        },
+        "orders": {
+            "order_id": "int32",
+            "customer_id": "int32",
+            "order_date": DATETIME,
+            "order_amount": "float64",
+            "status": "category",
+        },
+        "invoices": {
+            "invoice_id": "int32",
+            "order_id": "int32",
+            "invoice_date": DATETIME,
+            "due_date": DATETIME,
+            "amount_due": "float64",
+            "tax": "float64",
+            "discount": "float64",
+            "total_amount": "float64",
+            "status": "category",
+            "payment_plan": "category",
+            "installments": "int8",
+            "amount_paid": "float64",
+            "written_off_amount": "float64",
+            "balance": "float64",
+            "closed_date": DATETIME,
+        },
+        "payments": {
+            "payment_id": "int32",
+            "invoice_id": "int32",
+            "order_id": "int32",
+            "payment_date": DATETIME,
+            "installment_no": "int8",
+            "days_late": "int16",
+            "amount_paid": "float64",
+        },
+        "ar_subledger": {
+            "ar_entry_id": "int32",
+            "invoice_id": "int32",
+            "entry_date": DATETIME,
+            "entry_type": "category",
+            "amount": "float64",
+            "balance": "float64",
+            "days_past_due": "int32",
+        },
+        "expenses": {
+            "expense_id": "int32",
+            "vendor_id": "int32",
+            "expense_date": DATETIME,
+            "amount": "float64",
+            "cost_center": "category",
+            "account_id": "int32",
+        },
+        "gl_transactions": {
+            "gl_id": "int32",
+            "account_id": "int32",
+            "transaction_date": DATETIME,
+            "amount": "float64",
+            "source_type": "category",
+            "source_id": "int32",
+        },
+    },
+    "marketing": {
+        "campaigns": {
+            "campaign_id": "int32",
+            "campaign_name": "string",
+            "objective": "category",
+            "start_date": DATETIME,
+            "end_date": DATETIME,
+            "platform": "category",
+            "budget": "float64",
+        },
+        "ad_groups": {
+            "ad_group_id": "int32",
+            "campaign_id": "int32",
+            "target_audience": "category",
+            "gender": "category",
+            "interests": "category",
+            "device_type": "category",
+        },
+        "ads": {
+            "ad_id": "int32",
+            "ad_group_id": "int32",
+            "creative_type": "category",
+            "copy_length": "category",
+            "cta": "category",
+            "language": "category",
+        },
+        "daily_performance": {
+            "ad_id": "int32",
+            "date": DATETIME,
+            "impressions": "int32",
+            "clicks": "int32",
+            "spend": "float64",
+            "ctr": "float64",
+            "cpc": "float64",
+            "cpm": "float64",
+        },
+        "leads": {
+            "lead_id": "int32",
+            "ad_id": "int32",
+            "lead_date": DATETIME,
+            "lead_source": "category",
+            "utm_medium": "category",
+            "utm_campaign": "category",
+            "email": "string",
+            "phone": "string",
+            "is_mql": "int8",
+            "converted_to_customer": "int8",
+            "became_buyer": "int8",
+            "order_id": "Int32",
+            "customer_id": "Int32",
+            "funnel_stage": "category",
+        },
+    },
+    "ecommerce": {
+        "products": {
+            "product_id": "int32",
+            "sku": "string",
+            "product_name": "string",
+            "category": "category",
+            "subcategory": "category",
+            "brand": "category",
+            "base_cost": "float64",
+            "list_price": "float64",
+            "margin_pct": "float64",
+            "active_from": DATETIME,
+            "active_to": DATETIME,
+        },
+        "product_prices": {
+            "price_version_id": "int32",
+            "product_id": "int32",
+            "list_price": "float64",
+            "base_cost": "float64",
+            "margin_pct": "float64",
+            "active_from": DATETIME,
+            "active_to": DATETIME,
+        },
+        "customers": {
+            "customer_id": "int32",
+            "first_name": "category",
+            "last_name": "category",
+            "full_name": "string",
+            "email": "string",
+            "signup_date": DATETIME,
+            "country": "category",
+            "city": "category",
+            "gender": "category",
+            "age_group": "category",
+            "segment": "category",
+        },
+        "orders": {
+            "order_id": "int32",
+            "customer_id": "int32",
+            "order_date": DATETIME,
+            "financial_order_amount": "float64",
+            "status": "category",
+            "sales_channel": "category",
+            "payment_method": "category",
+            "shipping_method": "category",
+            "shipping_cost": "float64",
+            "discount_amount": "float64",
+            "currency": "category",
+            "items_gross_amount": "float64",
+            "net_amount": "float64",
+        },
+        "order_items": {
+            "order_item_id": "int32",
+            "order_id": "int32",
+            "product_id": "int32",
+            "quantity": "int16",
+            "unit_price": "float64",
+            "unit_cost": "float64",
+            "line_revenue": "float64",
+            "line_cost": "float64",
+            "line_margin": "float64",
+        },
+        "returns": {
+            "return_id": "int32",
+            "order_id": "int32",
+            "order_item_id": "Int32",
+            "product_id": "Int32",
+            "customer_id": "int32",
+            "return_date": DATETIME,
+            "reason": "category",
+            "qty_returned": "int16",
+            "refund_amount": "float64",
+            "restocking_fee": "float64",
+        },
+    },
+    "crm": {
+        "crm_customers": {
+            "customer_id": "int32",
+            "lifecycle_stage": "category",
+            "segment": "category",
+            "nps_score": "int8",
+            "preferred_channel": "category",
+            "consent_marketing": "int8",
+            "last_order_date": DATETIME,
+            "total_orders": "Int32",
+            "total_spent": "float64",
+            "clv_estimate": "float64",
+            "recency_days": "Int32",
+            "r_score": "Int8",
+            "f_score": "Int8",
+            "m_score": "Int8",
+            "rfm_score": "Int16",
+            "p_alive": "float64",
+        },
+        "crm_interactions": {
+            "interaction_id": "int32",
+            "customer_id": "int32",
+            "interaction_date": DATETIME,
+            "interaction_type": "category",
+            "channel": "category",
+            "agent_id": "int16",
+            "outcome": "category",
+            "notes": "category",
+        },
+        "crm_tickets": {
+            "ticket_id": "int32",
+            "customer_id": "int32",
+            "created_at": DATETIME,
+            "resolved_at": DATETIME,
+            "category": "category",
+            "status": "category",
+            "priority": "category",
+            "resolution_time_days": "int16",
+        },
+        "crm_churn_flags": {
+            "customer_id": "int32",
+            "nps_score": "int8",
+            "total_orders": "Int32",
+            "segment": "category",
+            "churn_probability": "float64",
+            "is_churned": "int8",
+            "churn_date": DATETIME,
+            "churn_reason": "category",
+        },
+        "crm_cohort_retention": {
+            "cohort_month": DATETIME,
+            "months_since_signup": "int16",
+            "cohort_size": "int32",
+            "active_customers": "int32",
+            "retention_rate": "float64",
+        },
+    },
+    "web": {
+        "sessions": {
+            "session_id": "int32",
+            "user_id": "int32",
+            "visit_date": DATETIME,
+            "device": "category",
+            "country": "category",
+            "traffic_source": "category",
+            "landing_page": "category",
+            "session_duration": "int32",
+            "pages_viewed": "int16",
+            "engaged_session": "int8",
+        },
+        "pageviews": {
+            "pageview_id": "int32",
+            "session_id": "int32",
+            "page_url": "category",
+            "timestamp": DATETIME,
+            "scroll_depth": "int16",
+            "time_on_page": "int16",
+        },
+        "events": {
+            "event_id": "int32",
+            "session_id": "int32",
+            "event_name": "category",
+            "event_timestamp": DATETIME,
+            "product_id": "Int32",
+            "value": "float64",
+        },
+        "web_conversions": {
+            "conversion_id": "int32",
+            "session_id": "int32",
+            "order_id": "int32",
+            "conversion_timestamp": DATETIME,
+            "revenue": "float64",
+            "conversion_type": "category",
+        },
+    },
+}
+
+
+def _cdc_schema(base, key):
+    """CDC log layout: lsn, op, op_ts, then the row image (nullable, since deletes carry only the key)."""
+    nullable = {"int32": "Int32", "int16": "Int16", "int8": "Int8"}
+    image = {col: dtype if col == key else nullable.get(dtype, dtype) for col, dtype in base.items()}
+    return {"lsn": "int64", "op": "category", "op_ts": DATETIME, **image}
+
+
+# change-data-capture logs written next to their snapshots (python -m src.etl --cdc)
+SCHEMAS["finance"]["invoices_cdc"] = _cdc_schema(SCHEMAS["finance"]["invoices"], "invoice_id")
+SCHEMAS["crm"]["crm_tickets_cdc"] = _cdc_schema(SCHEMAS["crm"]["crm_tickets"], "ticket_id")
+SCHEMAS["crm"]["crm_customers_cdc"] = _cdc_schema(SCHEMAS["crm"]["crm_customers"], "customer_id")
+
+
+def get_schema(domain, table):
+    """Column -> dtype mapping for `domain.table`."""
+    try:
+        return SCHEMAS[domain][table]
+    except KeyError:
+        raise KeyError(f"No schema registered for {domain}.{table}") from None
+
+
+def list_tables():
+    """All registered (domain, table) pairs."""
+    return [(domain, table) for domain, tables in SCHEMAS.items() for table in tables]
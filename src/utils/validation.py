@@ -0,0 +1,25 @@
+# ============================================
+# Schema validation helpers
+# ============================================
+
+
+class SchemaDriftError(ValueError):
+    """A table on disk no longer matches its registered schema."""
+
+
+def check_columns(table_name, expected, actual):
+    """Raise SchemaDriftError if the file header differs from the registry."""
+    expected, actual = list(expected), list(actual)
+    missing = [c for c in expected if c not in actual]
+    unexpected = [c for c in actual if c not in expected]
+    if missing or unexpected:
+        raise SchemaDriftError(
+            f"{table_name}: schema drift (missing={missing}, unexpected={unexpected})"
+        )
+
+
+def check_requested_columns(table_name, schema, columns):
+    """Raise SchemaDriftError if a caller asks for a column the registry does not know."""
+    unknown = [c for c in columns if c not in schema]
+    if unknown:
+        raise SchemaDriftError(f"{table_name}: unknown columns requested {unknown}")
@@ -0,0 +1,11 @@
+import pytest
+
+from src.etl.__main__ import main as generate_lake
+
+
+@pytest.fixture(scope="session")
+def raw_lake(tmp_path_factory):
+    """Every domain generated with its CDC logs into a throwaway raw directory."""
+    out = tmp_path_factory.mktemp("raw")
+    generate_lake(["--out", str(out), "--cdc", "--no-cache"])
+    return out
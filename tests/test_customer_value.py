@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.customer_value import bgnbd_predict
+
+# Fader, Hardie & Lee (2005) CDNOW fit and their worked example
+CDNOW = (0.243, 4.414, 0.793, 2.426)
+EXAMPLE = pd.DataFrame({"x": [2], "t_x": [30.43], "T": [38.86]})
+
+
+def test_bgnbd_predict_matches_published_example():
+    p_alive, expected = bgnbd_predict(CDNOW, EXAMPLE, 39)
+    assert p_alive[0] == pytest.approx(0.7266, abs=1e-4)
+    assert expected[0] == pytest.approx(1.226, abs=1e-3)
+
+
+def test_bgnbd_predict_is_continuous_through_a_equal_one():
+    r, alpha, _, b = CDNOW
+    summary = pd.DataFrame({"x": [0, 2, 10], "t_x": [0.0, 30.43, 35.0], "T": [38.86] * 3})
+    at_one = bgnbd_predict((r, alpha, 1.0, b), summary, 39)[1]
+    assert np.isfinite(at_one).all()
+    for a in (1 - 1e-3, 1 + 1e-3):
+        np.testing.assert_allclose(bgnbd_predict((r, alpha, a, b), summary, 39)[1], at_one, rtol=1e-3)
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.profiler import ColumnProfile
+
+
+def test_std_survives_chunking_and_merging_with_a_large_offset():
+    values = 1e9 + np.random.default_rng(0).normal(0.0, 1.0, 100_000)
+    shards = []
+    for part in np.array_split(values, 3):
+        profile = ColumnProfile("float64")
+        for chunk in np.array_split(part, 5):
+            profile.update(pd.Series(chunk))
+        shards.append(profile)
+    merged = shards[0].merge(shards[1]).merge(shards[2]).to_dict()
+
+    assert merged["mean"] == pytest.approx(values.mean(), abs=1e-4)
+    assert merged["std"] == pytest.approx(values.std(), abs=1e-4)
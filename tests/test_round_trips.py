@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from src.analytics.reconciliation import CHECKS, read_breaks, reconcile
+from src.etl.cdc import CDC_TABLES, Snapshot, compact, compact_table
+from src.utils.file_io import read_table
+from src.utils.lake_query import build_lake
+from src.utils.sampling import check_sample, sample_lake
+
+CDC_LOGS = [(domain, log, table, key) for domain, logs in CDC_TABLES.items()
+            for log, (table, key) in logs.items()]
+
+
+def assert_compacts_to_snapshot(raw_dir, domain, log_table, table, key, batch_size=None):
+    log = read_table(domain, log_table, raw_dir=raw_dir)
+    current = compact(log, key, batch_size=batch_size).to_frame()
+    expected = read_table(domain, table, raw_dir=raw_dir).sort_values(key).reset_index(drop=True)
+    assert list(current[key]) == list(expected[key])
+    for column in expected.columns:
+        assert current[column].astype(str).equals(expected[column].astype(str)), column
+
+
+@pytest.mark.parametrize("domain, log_table, table, key", CDC_LOGS)
+@pytest.mark.parametrize("batch_size", [None, 500])
+def test_cdc_compaction_equals_snapshot(raw_lake, domain, log_table, table, key, batch_size):
+    assert_compacts_to_snapshot(raw_lake, domain, log_table, table, key, batch_size)
+
+
+@pytest.mark.parametrize("domain, log_table, table, key", CDC_LOGS)
+def test_saved_snapshot_applies_only_new_events(raw_lake, tmp_path, domain, log_table, table, key):
+    log = read_table(domain, log_table, raw_dir=raw_lake).sort_values("lsn").reset_index(drop=True)
+    cut = len(log) // 2
+    path = tmp_path / table
+
+    _, applied = compact_table(log.iloc[:cut], key, path)
+    assert applied == cut
+    snap, applied = compact_table(log, key, path)
+    assert applied == len(log) - cut
+    assert snap.lsn == log["lsn"].max()
+
+    expected = compact(log, key).to_frame()
+    current = Snapshot.open(path).to_frame()
+    assert list(current[key]) == list(expected[key])
+    for column in expected.columns:
+        assert current[column].astype(str).equals(expected[column].astype(str)), column
+
+
+def test_apply_separates_superseded_and_stale_events():
+    log = pd.DataFrame({"lsn": [1, 2, 3], "op": ["I", "U", "I"], "op_ts": pd.Timestamp("2023-01-01"),
+                        "id": [1, 1, 2], "value": [10, 11, 20]})
+    stats = Snapshot("id").apply(log)
+    assert (stats["superseded"], stats["stale"], stats["inserted"]) == (1, 0, 2)
+
+    snap = compact(log, "id")
+    replay = log.iloc[[0, 1]].assign(value=[0, 1])
+    stats = snap.apply(replay)
+    assert (stats["superseded"], stats["stale"], stats["updated"]) == (1, 1, 0)
+    assert snap.to_frame()["value"].tolist() == [11, 20]
+
+
+@pytest.fixture(scope="module")
+def sample_dir(raw_lake, tmp_path_factory):
+    out = tmp_path_factory.mktemp("sample")
+    sample_lake(fraction=0.05, seed=42, raw_dir=raw_lake, out_dir=out)
+    return out
+
+
+def test_sample_is_join_complete(sample_dir):
+    report = check_sample(sample_dir)
+    checked = set(report["child"])
+    for domain, log_table, _, key in CDC_LOGS:
+        assert f"{domain}.{log_table}.{key}" in checked
+    assert report["orphans"].sum() == 0, report[report["orphans"] > 0]
+
+
+@pytest.mark.parametrize("domain, log_table, table, key", CDC_LOGS)
+def test_sampled_cdc_compacts_to_sampled_snapshot(sample_dir, domain, log_table, table, key):
+    assert_compacts_to_snapshot(sample_dir, domain, log_table, table, key)
+
+
+@pytest.fixture(scope="module")
+def lake_dir(raw_lake, tmp_path_factory):
+    out = tmp_path_factory.mktemp("lake")
+    build_lake(raw_dir=raw_lake, lake_dir=out)
+    return out
+
+
+def test_incremental_reconcile_equals_full(lake_dir, tmp_path):
+    full = reconcile(lake_dir=lake_dir, out_dir=tmp_path / "full", full=True)
+    for through in ["2023-02-10", "2023-03-31", "2023-04-02", None]:
+        incremental = reconcile(lake_dir=lake_dir, out_dir=tmp_path / "incremental", through=through)
+
+    for name in CHECKS:
+        expected = full[name].sort_values("date").reset_index(drop=True)
+        got = incremental[name].sort_values("date").reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
+
+        order = ["left_date", "order_id"]
+        expected = read_breaks(name, out_dir=tmp_path / "full").sort_values(order).reset_index(drop=True)
+        got = read_breaks(name, out_dir=tmp_path / "incremental").sort_values(order).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from src.utils.file_io import MB, LakeUploader, compute_etag
+
+BUCKET = "lake-resume-test"
+PART_SIZE = 5 * MB  # smallest part size S3 accepts
+
+
+class FlakyClient:
+    """S3 client whose connection drops after `parts_ok` part uploads; counts parts sent."""
+
+    def __init__(self, client, parts_ok=None):
+        self._client = client
+        self.parts_ok = parts_ok
+        self.sent = []
+
+    def upload_part(self, **kwargs):
+        if self.parts_ok is not None and len(self.sent) >= self.parts_ok:
+            raise ConnectionError("connection dropped")
+        self.sent.append(kwargs["PartNumber"])
+        return self._client.upload_part(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        import boto3
+
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_interrupted_multipart_upload_resumes_missing_parts(s3, tmp_path):
+    root = tmp_path / "raw"
+    root.mkdir()
+    path = root / "big.csv"
+    path.write_bytes(os.urandom(4 * PART_SIZE + MB))   # 5 parts
+
+    flaky = FlakyClient(s3, parts_ok=2)
+    uploader = LakeUploader(BUCKET, max_workers=1, part_size=PART_SIZE, multipart_threshold=PART_SIZE,
+                            client=flaky)
+    with pytest.raises(ConnectionError):
+        uploader.sync([root])
+    assert flaky.sent == [1, 2]
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+    rerun = FlakyClient(s3)
+    uploader = LakeUploader(BUCKET, max_workers=1, part_size=PART_SIZE, multipart_threshold=PART_SIZE,
+                            client=rerun)
+    stats = uploader.sync([root])
+
+    assert sorted(rerun.sent) == [3, 4, 5]
+    assert stats["resumed_parts"] == 2
+    remote = s3.head_object(Bucket=BUCKET, Key="raw/big.csv")["ETag"].strip('"')
+    assert remote == compute_etag(path, PART_SIZE, PART_SIZE)
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []